@@ -1,11 +1,12 @@
+import argparse
 import json
-import sys
 import logging
+import multiprocessing
 from pathlib import Path
 
-from client import run
 from fauhalma.constants import ENV_INFO, validate_constants
 from fauhalma.state import State
+from fauhalma.recording import RunRecorder
 
 from fauhalma.agents.greedy_agent import choose_move as choose_greedy
 
@@ -14,6 +15,16 @@ validate_constants()
 
 _ENV_SHAPE_CACHE: dict[str, str] = {}
 
+# Set from the optional second command line argument; percepts are logged for offline training
+_RECORDER: RunRecorder | None = None
+
+# Set by --search-workers / --depth / --time-budget: 3-player envs use a root-split search
+# with one worker pool per shape and process instead of the greedy agent
+_SEARCH_WORKERS = 0
+_SEARCH_DEPTH = 2
+_TIME_BUDGET: float | None = None
+_PARALLEL: dict = {}  # shape -> ParallelSearch
+
 def _env_from_run_url(run_url: str) -> str:
     parts = run_url.strip("/").split("/")
     i = parts.index("run")
@@ -29,6 +40,17 @@ def _shape_for_request(info) -> str:
     _ENV_SHAPE_CACHE[env] = shape
     return shape
 
+def _parallel_search(shape: str):
+    """The process's ParallelSearch for `shape`; None inside pool workers, which cannot fork one."""
+    if multiprocessing.current_process().daemon:
+        return None
+    if shape not in _PARALLEL:
+        # deferred like the client import: only search agents need NumPy and the process pool
+        from fauhalma.agents.search_agent import ParallelSearch
+        _PARALLEL[shape] = ParallelSearch(shape, _SEARCH_WORKERS)
+        _PARALLEL[shape].warm_up()
+    return _PARALLEL[shape]
+
 def agent_function(percept, info):
     pos = percept.get("position", percept) if isinstance(percept, dict) else percept
     state = State.from_position_dict(pos)
@@ -36,21 +58,53 @@ def agent_function(percept, info):
     shape = _shape_for_request(info)
     env = _env_from_run_url(info.run_url)
 
+    if _RECORDER is not None:
+        _RECORDER.record(env, info.run_id, info.action_number, pos)
+
+    if _SEARCH_WORKERS and ENV_INFO[env].players == 3:
+        search = _parallel_search(shape)
+        if search is not None:
+            return search.choose_move(state, _SEARCH_DEPTH, _TIME_BUDGET)
+        from fauhalma.agents.search_agent import choose_move as choose_search
+        return choose_search(state, shape, depth=_SEARCH_DEPTH)
+
     return choose_greedy(state, shape)
 
 
 if __name__ == "__main__":
-    config_path = sys.argv[1]
+    # deferred so that pool workers importing agent_function skip the client/requests import
+    from client import run
+
+    parser = argparse.ArgumentParser(description="Run the agent on one env config.")
+    parser.add_argument("config", help="agent config JSON file")
+    parser.add_argument("log_dir", nargs="?", help="record percepts to this directory")
+    parser.add_argument("--search-workers", type=int, default=0,
+                        help="3-player envs: parallel search with this many processes (0: greedy agent)")
+    parser.add_argument("--depth", type=int, default=2, help="search depth in plies")
+    parser.add_argument("--time-budget", type=float, default=None, help="seconds per move for the search")
+    args = parser.parse_args()
+
+    config_path = args.config
     cfg = json.loads(Path(config_path).read_text())
     print("Starting agent with config env:", cfg["env"])
+    if args.log_dir:
+        _RECORDER = RunRecorder(args.log_dir)
+        print("Recording percepts to:", args.log_dir)
+    _SEARCH_WORKERS = args.search_workers
+    _SEARCH_DEPTH = args.depth
+    _TIME_BUDGET = args.time_budget
 
-    run(
-        config_path,
-        agent_function,
-        parallel_runs=False,
-        processes=1,
-        abandon_old_runs=True,
-        run_limit=60,
-    )
+    try:
+        run(
+            config_path,
+            agent_function,
+            parallel_runs=False,
+            processes=1,
+            abandon_old_runs=True,
+            run_limit=60,
+        )
+    finally:
+        for search in _PARALLEL.values():
+            search.close()
 
     print("Exited cleanly.")
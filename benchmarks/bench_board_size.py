@@ -0,0 +1,83 @@
+"""
+How geometry construction, move generation and agent latency grow with board size.
+
+    python benchmarks/bench_board_size.py [--sizes 3 4 5] [--positions 20]
+
+Positions are taken from a greedy-vs-random game on each board, so they cover the
+opening, the crowded middle game and the end game.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fauhalma.agents.greedy_agent import choose_move as choose_greedy
+from fauhalma.agents.search_agent import choose_move as choose_search
+from fauhalma.geometry import get_geometry
+from fauhalma.moves import legal_moves
+from fauhalma.state import State, apply_move
+
+
+def sample_positions(shape: str, n: int, count: int, seed: int = 0) -> list[State]:
+    rng = random.Random(seed)
+    geo = get_geometry(shape, n)
+    players = "AB" if shape == "rhombus" else "ABC"
+    state = State({p: tuple(sorted(geo.start[p])) if p in players else () for p in "ABC"})
+    if shape == "rhombus":
+        # two-player rhombus: B starts in A's home corner
+        state = State({"A": tuple(sorted(geo.start["A"])), "B": tuple(sorted(geo.home["A"])), "C": ()})
+    out = []
+    for _ in range(count * 3):
+        out.append(state)
+        try:
+            state = apply_move(state, "A", choose_greedy(state, shape, n), n)
+        except RuntimeError:
+            break
+        for p in players[1:]:
+            moves = legal_moves(state, p, shape, n)
+            if moves:
+                state = apply_move(state, p, rng.choice(moves), n)
+    return out[::3][:count]
+
+
+def timed(fn, repeat: int) -> float:
+    t = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[3, 4, 5])
+    parser.add_argument("--shapes", nargs="+", default=["star", "rhombus"])
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--search-depth", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{'shape':>8s} {'N':>3s} {'cells':>6s} {'geometry ms':>12s} {'moves/pos':>10s} "
+          f"{'movegen ms':>11s} {'greedy ms':>10s} {'search ms':>10s}")
+    for shape in args.shapes:
+        for n in args.sizes:
+            get_geometry.cache_clear()
+            t = time.perf_counter()
+            geo = get_geometry(shape, n)
+            t_geo = time.perf_counter() - t
+
+            positions = sample_positions(shape, n, args.positions)
+            n_moves = sum(len(legal_moves(s, "A", shape, n)) for s in positions) / len(positions)
+            t_gen = sum(timed(lambda: legal_moves(s, "A", shape, n), 20) for s in positions) / len(positions)
+            t_greedy = sum(timed(lambda: choose_greedy(s, shape, n), 3) for s in positions) / len(positions)
+            few = positions[:max(1, len(positions) // 5)]
+            t_search = sum(timed(lambda: choose_search(s, shape, depth=args.search_depth, n=n), 1)
+                           for s in few) / len(few)
+
+            print(f"{shape:>8s} {n:3d} {len(geo.cells):6d} {t_geo * 1e3:12.2f} {n_moves:10.1f} "
+                  f"{t_gen * 1e3:11.3f} {t_greedy * 1e3:10.2f} {t_search * 1e3:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+List-based `legal_moves` versus the lazy, ordered `iter_moves` generator.
+
+    python benchmarks/bench_move_generator.py [--positions 20] [--depth 3]
+
+Reports, per position on average: memory blocks still allocated after the call (the
+returned moves) and peak bytes (tracemalloc) for building the full move list, for
+draining the generator and for taking only its first three moves, and the nodes/second
+of the alpha-beta search with either API.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from itertools import islice
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_board_size import sample_positions
+from fauhalma.agents.search_agent import Search
+from fauhalma.moves import iter_moves, legal_moves
+
+
+def allocations(fn) -> tuple[int, int]:
+    """(blocks allocated and kept by one call of fn, peak bytes during the call)."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fn()
+    after = tracemalloc.take_snapshot()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "lineno"))
+    return blocks, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shape", default="star")
+    parser.add_argument("--positions", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=3)
+    args = parser.parse_args()
+
+    positions = sample_positions(args.shape, 3, args.positions)
+    shape = args.shape
+    variants = {
+        "legal_moves (list)": lambda s: legal_moves(s, "A", shape),
+        "iter_moves (all)": lambda s: list(iter_moves(s, "A", shape)),
+        "iter_moves (first 3)": lambda s: list(islice(iter_moves(s, "A", shape), 3)),
+    }
+
+    print(f"{'move generation':>22s} {'blocks':>8s} {'peak KiB':>9s} {'us/call':>9s}")
+    for name, fn in variants.items():
+        blocks = peak = 0
+        for s in positions:
+            b, p = allocations(lambda: fn(s))
+            blocks += b
+            peak += p
+        t = time.perf_counter()
+        for _ in range(20):
+            for s in positions:
+                fn(s)
+        us = (time.perf_counter() - t) / (20 * len(positions)) * 1e6
+        print(f"{name:>22s} {blocks / len(positions):8.0f} {peak / len(positions) / 1024:9.1f} {us:9.1f}")
+
+    print()
+    print(f"{'search (depth ' + str(args.depth) + ')':>22s} {'nodes':>8s} {'leaves':>9s} {'seconds':>9s} {'nodes/s':>9s}")
+    for name, ordered in (("legal_moves (list)", False), ("iter_moves (ordered)", True)):
+        nodes = leaves = 0
+        t = time.perf_counter()
+        for s in positions:
+            search = Search(shape, ordered_moves=ordered)
+            search.root_scores(s, args.depth)
+            nodes += search.nodes
+            leaves += search.leaves
+        dt = time.perf_counter() - t
+        print(f"{name:>22s} {nodes:8d} {leaves:9d} {dt:9.2f} {(nodes + leaves) / dt:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Prediction accuracy of the opponent model and speedup of top-k opponent pruning.
+
+    python benchmarks/bench_opponent_model.py LOG_DIR [--k 3] [--depth 3]
+
+Runs of each env are split into a training and a held-out half; the model is
+fitted on the first half and measured on the second.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fauhalma.agents.search_agent import Search
+from fauhalma.constants import ENV_INFO
+from fauhalma.opponent_model import decisions_from_run, fit_opponent_model, prediction_accuracy
+from fauhalma.recording import iter_runs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("log_dir")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--positions", type=int, default=10, help="search positions per env")
+    args = parser.parse_args()
+
+    runs_by_env: dict[str, list] = {}
+    for env, run_id, states in iter_runs(args.log_dir):
+        if states:
+            runs_by_env.setdefault(env, []).append(states)
+
+    print(f"{'env':>14s} {'train':>6s} {'test':>6s} {'top1':>6s} {'top' + str(args.k):>6s} "
+          f"{'full s':>8s} {'top-k s':>8s} {'speedup':>8s} {'same move':>9s}")
+    for env, runs in sorted(runs_by_env.items()):
+        shape = ENV_INFO[env].shape
+        order = tuple(p for p in "ABC" if runs[0][0].pegs.get(p))
+        half = max(1, len(runs) // 2)
+        train = [d for r in runs[:half] for d in decisions_from_run(r, shape, order)]
+        test = [d for r in runs[half:] for d in decisions_from_run(r, shape, order)]
+        if not train:
+            continue
+        model = fit_opponent_model(train, shape)
+        top1, topk = prediction_accuracy(model, test, shape, args.k)
+
+        positions = [s for r in runs[half:] for s in r][:args.positions]
+        t_full = t_pruned = 0.0
+        agree = 0
+        for state in positions:
+            t = time.perf_counter()
+            moves, full = Search(shape).root_scores(state, args.depth)
+            t_full += time.perf_counter() - t
+            t = time.perf_counter()
+            _, pruned = Search(shape, opponent_model=model, top_k=args.k).root_scores(state, args.depth)
+            t_pruned += time.perf_counter() - t
+            agree += max(range(len(moves)), key=full.__getitem__) == max(range(len(moves)), key=pruned.__getitem__)
+
+        print(f"{env:>14s} {len(train):6d} {len(test):6d} {top1:6.2f} {topk:6.2f} "
+              f"{t_full:8.2f} {t_pruned:8.2f} {t_full / max(t_pruned, 1e-9):7.1f}x "
+              f"{agree:4d}/{len(positions):<4d}")
+
+
+if __name__ == "__main__":
+    main()
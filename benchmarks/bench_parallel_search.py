@@ -0,0 +1,63 @@
+"""
+Scaling of the parallel root-split search on the 3-player star board.
+
+    python benchmarks/bench_parallel_search.py [--workers 1 2 4 8] [--depth 3] [--positions 8]
+
+The corpus is every third position of a greedy-vs-random 3-player game (see
+bench_board_size.sample_positions). For each worker count: total wall time, speedup
+and efficiency (speedup / workers) against the sequential Search, nodes searched
+(shared-alpha overhead shows up here) and how often the chosen move agrees with the
+sequential search.
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_board_size import sample_positions
+from fauhalma.agents.search_agent import ParallelSearch, Search
+
+
+def best(moves, scores):
+    return moves[max(range(len(moves)), key=scores.__getitem__)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--positions", type=int, default=8)
+    args = parser.parse_args()
+
+    positions = sample_positions("star", 3, args.positions)
+    print(f"{len(positions)} positions, depth {args.depth}, {os.cpu_count()} CPUs")
+
+    t = time.perf_counter()
+    reference = []
+    seq_nodes = 0
+    for s in positions:
+        search = Search("star")
+        reference.append(best(*search.root_scores(s, args.depth)))
+        seq_nodes += search.nodes + search.leaves
+    t_seq = time.perf_counter() - t
+
+    print(f"{'workers':>8s} {'seconds':>8s} {'speedup':>8s} {'efficiency':>10s} {'nodes':>9s} {'same move':>9s}")
+    print(f"{'seq':>8s} {t_seq:8.2f} {1.0:8.2f} {'':>10s} {seq_nodes:9d} {'':>9s}")
+    for workers in args.workers:
+        with ParallelSearch("star", workers) as search:
+            search.warm_up()  # start the pool outside the timing
+            search.nodes = 0
+            t = time.perf_counter()
+            chosen = [search.choose_move(s, args.depth) for s in positions]
+            dt = time.perf_counter() - t
+        speedup = t_seq / dt
+        agree = sum(a == b for a, b in zip(chosen, reference))
+        print(f"{workers:8d} {dt:8.2f} {speedup:8.2f} {speedup / workers:10.2f} {search.nodes:9d} "
+              f"{agree:4d}/{len(positions):<4d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Bytes charged to one run by RunStateManager for an agent that keeps a search.
+
+    python benchmarks/bench_run_state.py [--moves 10]
+
+The agent holds a Search with an opponent model. The cached geometry, the evaluator
+and the (shared, per env) opponent model must not be charged to the run: the size
+is checked against the same agent with those references removed.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_board_size import sample_positions
+from client import Agent, deep_sizeof
+from fauhalma.agents.search_agent import Search
+from fauhalma.opponent_model import MOVE_FEATURES, OpponentModel
+
+
+class SearchAgent(Agent):
+    def __init__(self, run_id, agent_config, opponent_model):
+        super().__init__(run_id, agent_config)
+        self.search = Search("star", opponent_model=opponent_model, top_k=3)
+
+    def get_action(self, percept, request_info):
+        moves, scores = self.search.root_scores(percept, 2)
+        return moves[int(np.argmax(scores))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--moves", type=int, default=10)
+    args = parser.parse_args()
+
+    model = OpponentModel({p: np.ones(len(MOVE_FEATURES)) for p in "BC"})
+    agent = SearchAgent("run", {"agent": "a", "env": "e", "url": "", "pwd": ""}, model)
+    for state in sample_positions("star", 3, args.moves, 0):
+        agent.get_action(state, None)
+
+    charged = deep_sizeof(agent)
+    search = agent.search
+    shared = (search.geo, search.evaluator, search.opponent_model)
+    search.geo = search.evaluator = search.opponent_model = None
+    without_shared = deep_sizeof(agent)
+    search.geo, search.evaluator, search.opponent_model = shared
+
+    print(f"charged to the run: {charged} bytes "
+          f"({len(search.best_moves)} best moves, opponent reply cache {len(model._cache)} entries not charged)")
+    assert charged == without_shared, (charged, without_shared)
+
+
+if __name__ == "__main__":
+    main()
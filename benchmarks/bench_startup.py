@@ -0,0 +1,89 @@
+"""
+Startup cost of worker processes.
+
+    python benchmarks/bench_startup.py [--repeat 5]
+
+1. Import time of `client` and `agent` in a fresh interpreter, with the geometry
+   snapshot and with FAUHALMA_NO_SNAPSHOT=1 (geometry rebuilt on import).
+2. Cold worker spawn: time from creating a one-process `spawn` pool (what macOS and
+   Windows always do) until the first move for the start position comes back.
+
+Medians over --repeat runs.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def import_time(module: str, snapshot: bool) -> float:
+    env = dict(os.environ)
+    env.pop("FAUHALMA_NO_SNAPSHOT", None)
+    if not snapshot:
+        env["FAUHALMA_NO_SNAPSHOT"] = "1"
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _start_percept() -> tuple:
+    from client import RequestInfo
+    from fauhalma.geometry import get_geometry
+
+    geo = get_geometry("star")
+    position = {p: [list(c) for c in sorted(geo.start[p])] for p in "ABC"}
+    return {"position": position}, RequestInfo("https://example.invalid/run/ws2526.1.2.5/bench", 0, "bench")
+
+
+def spawn_time(snapshot: bool) -> float:
+    from agent import agent_function
+
+    percept, info = _start_percept()
+    if snapshot:
+        os.environ.pop("FAUHALMA_NO_SNAPSHOT", None)
+    else:
+        os.environ["FAUHALMA_NO_SNAPSHOT"] = "1"
+    ctx = multiprocessing.get_context("spawn")
+    t = time.perf_counter()
+    with ctx.Pool(processes=1) as pool:
+        pool.apply(agent_function, (percept, info))
+        dt = time.perf_counter() - t
+    os.environ.pop("FAUHALMA_NO_SNAPSHOT", None)
+    return dt
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # make sure the snapshot exists
+    subprocess.run([sys.executable, "-m", "fauhalma.geometry"], cwd=ROOT, check=True, capture_output=True)
+
+    print(f"{'measurement':>30s} {'snapshot ms':>12s} {'rebuild ms':>11s}")
+    for module in ("client", "fauhalma.constants", "agent"):
+        with_snap = statistics.median(import_time(module, True) for _ in range(args.repeat))
+        without = statistics.median(import_time(module, False) for _ in range(args.repeat))
+        print(f"{'import ' + module:>30s} {with_snap * 1e3:12.1f} {without * 1e3:11.1f}")
+
+    with_snap = statistics.median(spawn_time(True) for _ in range(args.repeat))
+    without = statistics.median(spawn_time(False) for _ in range(args.repeat))
+    print(f"{'cold spawn + first move':>30s} {with_snap * 1e3:12.1f} {without * 1e3:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
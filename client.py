@@ -14,13 +14,15 @@ import dataclasses
 import json
 import logging
 import multiprocessing
+import sys
 import time
+import types
+from collections import OrderedDict
+from functools import partial
 from multiprocessing import Process
 from multiprocessing.connection import Connection
 from pathlib import Path
-from typing import TypedDict, Optional, Callable, Any, Literal
-
-import requests as requests_lib
+from typing import TypedDict, Optional, Callable, Any, Iterable, Literal, Generic, TypeVar
 
 logger = logging.getLogger(__name__)
 
@@ -70,6 +72,8 @@ def send_request(
         to_abandon: Optional[list[str]] = None,
         parallel_runs: bool = True
 ) -> ServerResponse:
+    import requests as requests_lib  # deferred: worker processes never talk to the server
+
     while True:  # retry until success
         logger.debug(f'Sending request with {len(actions) or "no"} actions: {actions}')
         base_url = config['url']
@@ -124,6 +128,10 @@ class RequestProcessor(abc.ABC):
     def close(self):
         pass
 
+    def runs_to_abandon(self) -> list[str]:
+        """Runs the processor gave up on; they are abandoned with the next server request."""
+        return []
+
     def on_new_run(self, run_id: str):
         logger.info(f'Starting new run ({run_id})')
 
@@ -206,38 +214,266 @@ class Agent(abc.ABC):
             multiprocessing: bool = False,
             abandon_old_runs: bool = False,
             run_limit: Optional[int] = None,
+            memory_budget: Optional[int] = None,
+            max_cached_runs: Optional[int] = None,
+            eviction: Literal['lru', 'size'] = 'lru',
+            max_processes: Optional[int] = None,
+            max_idle_processes: Optional[int] = None,
+            max_runs_per_process: Optional[int] = None,
     ):
+        """
+        `memory_budget` (bytes) and `max_cached_runs` bound the per-run agent objects kept
+        alive (see RunStateManager). With `multiprocessing`, `max_processes` bounds the
+        number of worker processes; idle workers beyond `max_idle_processes` are stopped and
+        workers are replaced after `max_runs_per_process` runs.
+
+        The two groups of options belong to different modes (agents live in this process
+        vs. in workers), so combining one with the other mode raises a ValueError.
+        """
+        if multiprocessing and (memory_budget is not None or max_cached_runs is not None or eviction != 'lru'):
+            raise ValueError('memory_budget, max_cached_runs and eviction only apply without multiprocessing; '
+                             'use max_processes to bound the workers')
+        if not multiprocessing and (max_processes is not None or max_idle_processes is not None
+                                    or max_runs_per_process is not None):
+            raise ValueError('max_processes, max_idle_processes and max_runs_per_process require multiprocessing=True')
         agent_config = _get_agent_config(agent_config_file)
         request_processor: RequestProcessor
         if multiprocessing:
-            request_processor = MultiProcessAgentRequestProcessor(cls, agent_config)
+            request_processor = MultiProcessAgentRequestProcessor(
+                cls, agent_config,
+                max_processes=max_processes,
+                max_idle_processes=max_idle_processes,
+                max_runs_per_process=max_runs_per_process,
+            )
         else:
-            request_processor = SequentialAgentRequestProcessor(cls, agent_config)
+            request_processor = SequentialAgentRequestProcessor(
+                cls, agent_config,
+                RunStateManager(max_bytes=memory_budget, max_entries=max_cached_runs, policy=eviction,
+                                sizeof=partial(deep_sizeof, shared=(agent_config,))),
+            )
         _run(agent_config, request_processor, parallel_runs=parallel_runs,
              abandon_old_runs=abandon_old_runs, run_limit=run_limit)
 
 
+T = TypeVar('T')
+
+
+# never walked into: code and modules belong to the process, not to a run
+_NOT_RUN_STATE = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(obj: Any, limit: int = 100_000, shared: Iterable[Any] = ()) -> int:
+    """
+    Approximate memory footprint of `obj` and everything reachable from it, following
+    containers, instance __dict__ and __slots__ (at most `limit` objects are visited).
+    Objects with a `memory_usage()` method report their own size instead. A warning is
+    logged when the limit cuts the walk short, since the result is then too small.
+
+    Objects that all runs share are not charged: the ones in `shared`, and instances of
+    classes that set `shared_across_runs = True` (e.g. cached board geometry, evaluators,
+    opponent models). Evicting a run would not free them.
+    """
+    usage = getattr(obj, 'memory_usage', None)
+    if callable(usage):
+        return int(usage())
+
+    excluded = {id(o) for o in shared}
+    seen: set[int] = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        if len(seen) >= limit:
+            logger.warning(f'deep_sizeof stopped after {limit} objects, {type(obj).__name__} is larger than '
+                           f'the {total} bytes reported; give it a memory_usage() method')
+            break
+        o = stack.pop()
+        if id(o) in seen or id(o) in excluded or isinstance(o, _NOT_RUN_STATE) \
+                or getattr(type(o), 'shared_across_runs', False):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o, 0)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        else:
+            if hasattr(o, '__dict__'):
+                stack.append(vars(o))
+            for slot in getattr(type(o), '__slots__', ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return total
+
+
+@dataclasses.dataclass
+class EvictionStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    evicted_bytes: int = 0
+    current_bytes: int = 0
+    peak_bytes: int = 0
+    peak_entries: int = 0
+
+    def __str__(self) -> str:
+        return (f'{self.hits} hits, {self.misses} misses, {self.evictions} evictions '
+                f'({self.evicted_bytes} bytes), {self.current_bytes} bytes in use '
+                f'(peak {self.peak_bytes} bytes, {self.peak_entries} runs)')
+
+
+class RunStateManager(Generic[T]):
+    """
+    Holds per-run objects (agents, search caches, worker processes) under a budget.
+
+    `max_bytes` bounds the total size as measured by `sizeof`. Objects with a
+    `memory_usage()` method are re-measured on every `update`; for everything else the
+    (expensive) deep walk only runs on `put` and every `measure_every`-th `update` of an
+    entry, so sizes in between may lag. `max_entries` bounds the number of runs. When over budget, entries are
+    evicted either least recently used first (`policy='lru'`) or largest first
+    (`policy='size'`, ties broken by recency). Entries in `pinned` are never evicted.
+    `on_evict(run_id, obj)` is called for every evicted entry.
+    """
+
+    def __init__(
+            self,
+            max_bytes: Optional[int] = None,
+            max_entries: Optional[int] = None,
+            policy: Literal['lru', 'size'] = 'lru',
+            sizeof: Callable[[T], int] = deep_sizeof,
+            on_evict: Optional[Callable[[str, T], None]] = None,
+            measure_every: int = 16,
+    ):
+        if policy not in ('lru', 'size'):
+            raise ValueError(f'Unknown eviction policy {policy!r}')
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.policy = policy
+        self.sizeof = sizeof
+        self.on_evict = on_evict
+        self.measure_every = measure_every
+        self.entries: OrderedDict[str, T] = OrderedDict()  # least recently used first
+        self.sizes: dict[str, int] = {}
+        self.updates: dict[str, int] = {}
+        self.pinned: set[str] = set()
+        self.stats = EvictionStats()
+
+    def __contains__(self, run_id: Optional[str]) -> bool:
+        return run_id in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __getitem__(self, run_id: str) -> T:
+        return self.entries[run_id]
+
+    def get(self, run_id: str) -> Optional[T]:
+        obj = self.entries.get(run_id)
+        if obj is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+            self.entries.move_to_end(run_id)
+        return obj
+
+    def put(self, run_id: str, obj: T) -> None:
+        if run_id in self.entries:
+            self.pop(run_id)
+        self.entries[run_id] = obj
+        self.entries.move_to_end(run_id)
+        self.sizes[run_id] = 0
+        self.updates[run_id] = -1
+        self.update(run_id)
+
+    def update(self, run_id: str) -> None:
+        """Re-measures an entry if due (e.g. after its caches grew) and evicts if over budget."""
+        if run_id not in self.entries:
+            return
+        obj = self.entries[run_id]
+        self.updates[run_id] += 1
+        if self.max_bytes is not None and (
+                self.updates[run_id] % self.measure_every == 0 or callable(getattr(obj, 'memory_usage', None))):
+            new = self.sizeof(obj)
+            self.stats.current_bytes += new - self.sizes[run_id]
+            self.sizes[run_id] = new
+        self.stats.peak_bytes = max(self.stats.peak_bytes, self.stats.current_bytes)
+        self.stats.peak_entries = max(self.stats.peak_entries, len(self.entries))
+        self._enforce_budget()
+
+    def pop(self, run_id: str) -> Optional[T]:
+        obj = self.entries.pop(run_id, None)
+        if obj is not None:
+            self.stats.current_bytes -= self.sizes.pop(run_id)
+            del self.updates[run_id]
+        return obj
+
+    def items(self):
+        return list(self.entries.items())
+
+    def _over_budget(self) -> bool:
+        return ((self.max_entries is not None and len(self.entries) > self.max_entries)
+                or (self.max_bytes is not None and self.stats.current_bytes > self.max_bytes))
+
+    def _victim(self) -> Optional[str]:
+        candidates = [r for r in self.entries if r not in self.pinned]
+        if not candidates:
+            return None
+        if self.policy == 'size':
+            return max(candidates, key=lambda r: self.sizes[r])  # max() keeps the first (LRU) on ties
+        return candidates[0]
+
+    def evict_one(self) -> Optional[tuple[str, T]]:
+        """Evicts one unpinned entry according to the policy; (run_id, obj) or None if there is none."""
+        victim = self._victim()
+        if victim is None:
+            return None
+        size = self.sizes[victim]
+        obj = self.pop(victim)
+        self.stats.evictions += 1
+        self.stats.evicted_bytes += size
+        logger.debug(f'Evicted state of run {victim} ({size} bytes)')
+        if self.on_evict is not None:
+            self.on_evict(victim, obj)
+        return victim, obj
+
+    def _enforce_budget(self) -> None:
+        while self._over_budget() and self.evict_one() is not None:
+            pass
+
+
 class SequentialAgentRequestProcessor(RequestProcessor):
-    def __init__(self, agent_class: type[Agent], agent_config: AgentConfig):
+    """
+    Agents are kept in a RunStateManager: an agent evicted under memory pressure is
+    simply recreated if its run sends another request, so agents must treat their
+    per-run state as a cache.
+    """
+
+    def __init__(self, agent_class: type[Agent], agent_config: AgentConfig,
+                 state_manager: Optional[RunStateManager[Agent]] = None):
         self.agent_class = agent_class
         self.agent_config = agent_config
-        self.agents: dict[str, Agent] = {}
+        self.agents: RunStateManager[Agent] = state_manager if state_manager is not None else RunStateManager()
 
     def process_requests(self, requests: list[tuple[Any, RequestInfo]], counter: _RunTracker) -> list[Action]:
         actions: list[Action] = []
         for percept, request_info in requests:
-            if request_info.run_id not in self.agents:
-                self.agents[request_info.run_id] = self.agent_class(request_info.run_id, self.agent_config)
+            agent = self.agents.get(request_info.run_id)
+            if agent is None:
+                agent = self.agent_class(request_info.run_id, self.agent_config)
+                self.agents.put(request_info.run_id, agent)
 
+            self.agents.pinned = {request_info.run_id}
             actions.append({
                 'run': request_info.run_id,
                 'act_no': request_info.action_number,
-                'action': self.agents[request_info.run_id].get_action(percept, request_info)
+                'action': agent.get_action(percept, request_info)
             })
+            self.agents.update(request_info.run_id)
+            self.agents.pinned = set()
 
-        for run_id in list(self.agents.keys()):
+        for run_id, _agent in self.agents.items():
             if run_id not in counter.ongoing_runs:
-                del self.agents[run_id]
+                self.agents.pop(run_id)
 
         return actions
 
@@ -253,6 +489,9 @@ class SequentialAgentRequestProcessor(RequestProcessor):
         else:
             super().on_message(message)
 
+    def close(self):
+        logger.info(f'Per-run agent state: {self.agents.stats}')
+
 
 class AgentProcess:
     def __init__(self, agent_class: type[Agent]):
@@ -300,45 +539,121 @@ class AgentProcess:
 
 
 class MultiProcessAgentRequestProcessor(RequestProcessor):
-    def __init__(self, agent_class: type[Agent], agent_config: AgentConfig):
+    """
+    One AgentProcess per ongoing run. With `max_processes`, at most that many workers are
+    assigned at once: a new run takes over the worker of the least recently active run
+    (whose agent is recreated if that run comes back), and requests are answered in
+    waves of at most `max_processes`. Runs that already have a worker are served first
+    and are not evicted while their request of the same poll is outstanding. Still, with
+    more active runs than `max_processes`, some run loses its agent state on every poll.
+
+    Workers released by finished runs are kept for reuse up to `max_idle_processes`.
+    Workers are replaced after `max_runs_per_process` runs, also when taken over.
+    """
+
+    def __init__(
+            self,
+            agent_class: type[Agent],
+            agent_config: AgentConfig,
+            *,
+            max_processes: Optional[int] = None,
+            max_idle_processes: Optional[int] = None,
+            max_runs_per_process: Optional[int] = None,
+    ):
         self.agent_class = agent_class
         self.agent_config = agent_config
-        self.assigned_processes: dict[str, AgentProcess] = {}
+        self.max_processes = max_processes
+        self.max_idle_processes = max_idle_processes
+        self.max_runs_per_process = max_runs_per_process
+        # max_processes is enforced in process_requests, which hands evicted workers on itself
+        self.assigned_processes: RunStateManager[AgentProcess] = RunStateManager(sizeof=lambda proc: 0)
         self.unassigned_processes: list[AgentProcess] = []
+        self.runs_served: dict[AgentProcess, int] = {}
+        self.started_processes = 0
+        self.stopped_processes = 0
+        self.taken_over_processes = 0
+
+    def _acquire(self) -> AgentProcess:
+        if self.unassigned_processes:
+            return self.unassigned_processes.pop()
+        self.started_processes += 1
+        process = AgentProcess(self.agent_class)
+        self.runs_served[process] = 0
+        return process
+
+    def _worn_out(self, process: AgentProcess) -> bool:
+        return self.max_runs_per_process is not None and self.runs_served[process] >= self.max_runs_per_process
+
+    def _retire(self, process: AgentProcess):
+        self.runs_served.pop(process)
+        self.stopped_processes += 1
+        process.stop()
+
+    def _release(self, process: AgentProcess):
+        too_many = self.max_idle_processes is not None and len(self.unassigned_processes) >= self.max_idle_processes
+        if self._worn_out(process) or too_many:
+            self._retire(process)
+        else:
+            self.unassigned_processes.append(process)
+
+    def _collect(self, wave: list[RequestInfo]) -> list[Action]:
+        return [
+            {
+                'run': request_info.run_id,
+                'act_no': request_info.action_number,
+                'action': self.assigned_processes[request_info.run_id].get_response()
+            } for request_info in wave
+        ]
 
     def process_requests(self, requests: list[tuple[Any, RequestInfo]], counter: _RunTracker) -> list[Action]:
         # unassign processes for finished runs
-        for run_id, proc in list(self.assigned_processes.items()):
+        for run_id, proc in self.assigned_processes.items():
             if run_id not in counter.ongoing_runs:
-                del self.assigned_processes[run_id]
-                self.unassigned_processes.append(proc)
+                self.assigned_processes.pop(run_id)
+                self._release(proc)
+
+        # runs that have a worker first, so a new run only evicts one whose request is answered
+        requests = sorted(requests, key=lambda r: r[1].run_id not in self.assigned_processes)
 
         actions: list[Action] = []
+        wave: list[RequestInfo] = []
         for percept, request_info in requests:
-            if request_info.run_id not in self.assigned_processes:
-                if self.unassigned_processes:
-                    process = self.unassigned_processes.pop()
+            process = self.assigned_processes.get(request_info.run_id)
+            if process is None:
+                if self.max_processes is not None and len(self.assigned_processes) >= self.max_processes:
+                    evicted = self.assigned_processes.evict_one()
+                    if evicted is None:
+                        # every worker is busy with this wave: wait for it first
+                        actions.extend(self._collect(wave))
+                        wave = []
+                        self.assigned_processes.pinned = set()
+                        evicted = self.assigned_processes.evict_one()
+                    # the new run takes over the evicted run's worker, unless that one is used up
+                    _run_id, process = evicted
+                    if self._worn_out(process):
+                        self._retire(process)
+                        process = self._acquire()
+                    else:
+                        self.taken_over_processes += 1
                 else:
-                    process = AgentProcess(self.agent_class)
+                    process = self._acquire()
                 process.new_run(request_info.run_id, self.agent_config)
-                self.assigned_processes[request_info.run_id] = process
-
-            self.assigned_processes[request_info.run_id].send_action_request(percept, request_info)
+                self.runs_served[process] += 1
+                self.assigned_processes.put(request_info.run_id, process)
 
-        for percept, request_info in requests:
-            actions.append({
-                'run': request_info.run_id,
-                'act_no': request_info.action_number,
-                'action': self.assigned_processes[request_info.run_id].get_response()
-            })
+            self.assigned_processes.pinned.add(request_info.run_id)
+            process.send_action_request(percept, request_info)
+            wave.append(request_info)
 
+        actions.extend(self._collect(wave))
+        self.assigned_processes.pinned = set()
         return actions
 
     def on_finished_run(self, run_id: str, url: str, outcome: Any):
-        if run_id in self.assigned_processes:
-            self.assigned_processes[run_id].finish_run(outcome)
-            self.unassigned_processes.append(self.assigned_processes[run_id])
-            del self.assigned_processes[run_id]
+        process = self.assigned_processes.pop(run_id)
+        if process is not None:
+            process.finish_run(outcome)
+            self._release(process)
         else:
             super().on_finished_run(run_id, url, outcome)
 
@@ -349,7 +664,9 @@ class MultiProcessAgentRequestProcessor(RequestProcessor):
             super().on_message(message)
 
     def close(self):
-        for proc in self.assigned_processes.values():
+        logger.info(f'Worker processes: {self.started_processes} started, {self.stopped_processes} recycled, '
+                    f'{self.taken_over_processes} taken over; run assignments: {self.assigned_processes.stats}')
+        for _run_id, proc in self.assigned_processes.items():
             proc.stop()
         for proc in self.unassigned_processes:
             proc.stop()
@@ -401,6 +718,7 @@ def _run(
                 request_processor.on_finished_run(run_id, get_run_url(agent_config, run_id), outcome)
 
             actions_to_send = request_processor.process_requests(requests, counter)
+            to_abandon.extend(request_processor.runs_to_abandon())
 
     finally:
         request_processor.close()
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from fauhalma.moves import legal_moves
 from fauhalma.state import State, Coord
-from fauhalma.constants import HOME
+from fauhalma.constants import N, home_cells
 from fauhalma.heuristics import dist_to_set
 
 
@@ -19,14 +19,15 @@ def _total_dist(coords: tuple[Coord, ...], home: set[Coord]) -> int:
     return sum(dist_to_set(c, home) for c in coords)
 
 
-def choose_move(state: State, shape: str):
-    moves = legal_moves(state, "A", shape)
+def choose_move(state: State, shape: str, n: int = N):
+    moves = legal_moves(state, "A", shape, n)
     if not moves:
         raise RuntimeError("No legal moves for A")
 
-    homeA = HOME["A"]
-    homeB = HOME["B"]
-    homeC = HOME["C"]
+    home = home_cells(n)
+    homeA = home["A"]
+    homeB = home["B"]
+    homeC = home["C"]
 
     A0 = state.pegs.get("A", ())
     B0 = state.pegs.get("B", ())
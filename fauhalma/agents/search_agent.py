@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from time import monotonic
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fauhalma.constants import N, home_cells
+from fauhalma.evaluation import DEFAULT_EVALUATOR
+from fauhalma.geometry import get_geometry
+from fauhalma.moves import IdxMove, from_server_move, iter_moves, legal_moves, to_server_move
+from fauhalma.state import State, apply_move
+
+PLAYERS = ("A", "B", "C")
+WIN = 10**9
+INF = float("inf")
+
+
+def turn_order(state: State) -> Tuple[str, ...]:
+    return tuple(p for p in PLAYERS if state.pegs.get(p))
+
+
+def _a_finished(state: State, n: int = N) -> bool:
+    home = home_cells(n)["A"]
+    return all(c in home for c in state.pegs.get("A", ()))
+
+
+def _key(state: State) -> Tuple:
+    return tuple(state.pegs.get(p, ()) for p in PLAYERS)
+
+
+class SearchAborted(Exception):
+    """Raised out of Search.value when its `should_stop` callback fires."""
+
+
+class Search:
+    """
+    Depth-limited paranoid alpha-beta search for player A: A maximises, every opponent
+    minimises A's evaluation. The children of each frontier node are evaluated as one
+    batch so the evaluator can vectorise over them.
+
+    Moves come from the lazy `iter_moves` generator, best move of a previous visit first,
+    so a cutoff stops move generation early. With `ordered_moves=False` the plain
+    `legal_moves` lists are used instead (for benchmarking). The best-move table is
+    filled by the iterative deepening in `root_scores`; pass the same `best_moves` dict
+    to later searches (e.g. one per agent) to keep it across moves.
+
+    With an `opponent_model` and `top_k`, opponent nodes only expand the `top_k`
+    replies the model considers most likely.
+
+    `should_stop` is polled every `STOP_CHECK_NODES` nodes; once it returns True the
+    search raises SearchAborted.
+    """
+
+    STOP_CHECK_NODES = 64
+    MAX_BEST_MOVES = 100_000
+
+    def __init__(self, shape: str, evaluator=DEFAULT_EVALUATOR, opponent_model=None, top_k: Optional[int] = None,
+                 n: int = N, ordered_moves: bool = True, should_stop: Optional[Callable[[], bool]] = None,
+                 best_moves: Optional[Dict[Tuple, IdxMove]] = None):
+        self.shape = shape
+        self.n = n
+        self.geo = get_geometry(shape, n)
+        self.evaluator = evaluator
+        self.opponent_model = opponent_model
+        self.top_k = top_k
+        self.ordered_moves = ordered_moves
+        self.should_stop = should_stop
+        self.best_moves: Dict[Tuple, IdxMove] = best_moves if best_moves is not None else {}
+        self.nodes = 0
+        self.leaves = 0
+
+    def _moves(self, state: State, player: str) -> Iterable[IdxMove]:
+        if player != "A" and self.opponent_model is not None and self.top_k is not None:
+            replies = self.opponent_model.likely_replies(state, player, self.shape, self.top_k, self.n)
+            return [from_server_move(self.geo, mv) for mv in replies]
+        if not self.ordered_moves:
+            return [from_server_move(self.geo, mv) for mv in legal_moves(state, player, self.shape, self.n)]
+        return iter_moves(state, player, self.shape, self.n, tt_move=self.best_moves.get(_key(state)))
+
+    def _child(self, state: State, player: str, mv: IdxMove) -> State:
+        return apply_move(state, player, (self.geo.cells[mv[0]], self.geo.cells[mv[1]]), self.n)
+
+    def _leaf_scores(self, states: Sequence[State]) -> List[float]:
+        self.leaves += len(states)
+        scores = [float(x) for x in self.evaluator.evaluate(states, self.shape, n=self.n)]
+        return [WIN if _a_finished(s, self.n) else x for s, x in zip(states, scores)]
+
+    def value(self, state: State, order: Tuple[str, ...], ply: int, depth: int,
+              alpha: float = -INF, beta: float = INF) -> float:
+        self.nodes += 1
+        if self.should_stop is not None and self.nodes % self.STOP_CHECK_NODES == 0 and self.should_stop():
+            raise SearchAborted
+        if _a_finished(state, self.n):
+            return WIN
+        player = order[ply % len(order)]
+        maximising = player == "A"
+
+        if depth == 1:
+            # frontier node: evaluate all children in one batch
+            children = [self._child(state, player, mv) for mv in self._moves(state, player)]
+            if not children:
+                return self._leaf_scores([state])[0]
+            scores = self._leaf_scores(children)
+            return max(scores) if maximising else min(scores)
+
+        best = -INF if maximising else INF
+        best_move: Optional[IdxMove] = None
+        for mv in self._moves(state, player):
+            v = self.value(self._child(state, player, mv), order, ply + 1, depth - 1, alpha, beta)
+            if (v > best) if maximising else (v < best):
+                best, best_move = v, mv
+            if maximising:
+                alpha = max(alpha, v)
+            else:
+                beta = min(beta, v)
+            if alpha >= beta:
+                break
+
+        if best_move is None:
+            # no legal move: the turn passes
+            return self.value(state, order, ply + 1, depth - 1, alpha, beta)
+        if len(self.best_moves) >= self.MAX_BEST_MOVES:
+            self.best_moves.clear()
+        self.best_moves[_key(state)] = best_move
+        return best
+
+    def root_scores(self, state: State, depth: int) -> Tuple[List, List[float]]:
+        """
+        Server-format moves of A and their scores. Moves that cannot beat the best one
+        found before them are cut off, so their score is only an upper bound.
+
+        Iterative deepening: depths 1..depth are searched in turn, each trying the root
+        moves best-first by the previous iteration's scores and leaving its best replies
+        in `best_moves` for the next one.
+        """
+        self.nodes += 1
+        moves = list(self._moves(state, "A"))
+        children = [self._child(state, "A", mv) for mv in moves]
+        server_moves = [to_server_move(self.geo, mv) for mv in moves]
+        scores = self._leaf_scores(children)
+
+        order = turn_order(state)
+        for d in range(2, depth + 1):
+            ranked = sorted(range(len(moves)), key=lambda i: -scores[i])
+            deeper = [-INF] * len(moves)
+            alpha = -INF
+            for i in ranked:
+                v = self.value(children[i], order, 1, d - 1, alpha, INF)
+                deeper[i] = v
+                alpha = max(alpha, v)
+            scores = deeper
+        return server_moves, scores
+
+
+def choose_move(
+    state: State,
+    shape: str,
+    evaluator=DEFAULT_EVALUATOR,
+    depth: int = 2,
+    opponent_model=None,
+    top_k: Optional[int] = None,
+    n: int = N,
+    best_moves: Optional[Dict[Tuple, IdxMove]] = None,
+):
+    search = Search(shape, evaluator, opponent_model, top_k, n, best_moves=best_moves)
+    moves, scores = search.root_scores(state, depth)
+    if not moves:
+        raise RuntimeError("No legal moves for A")
+    best = max(range(len(moves)), key=lambda i: scores[i])
+    return moves[best]
+
+
+# ---------- Parallel root split ----------
+# Worker-side shared state, set by _init_worker: the best root score found so far in the
+# current search (used as alpha by every worker) and the id of that search. Tasks whose
+# search id is no longer current (timed out or superseded) abort as soon as they notice.
+_shared_alpha = None
+_shared_generation = None
+# Best-move tables per (shape, n), kept by each worker across tasks and moves.
+_worker_best_moves: Dict[Tuple[str, int], Dict[Tuple, IdxMove]] = {}
+
+
+def _init_worker(alpha, generation) -> None:
+    global _shared_alpha, _shared_generation
+    _shared_alpha = alpha
+    _shared_generation = generation
+
+
+def _warm_up_worker() -> int:
+    return os.getpid()
+
+
+def _score_root_move(state: State, shape: str, n: int, depth: int, mv: IdxMove, generation: int,
+                     evaluator, opponent_model, top_k: Optional[int]) -> Optional[Tuple[float, bool, int]]:
+    """
+    (score, exact, nodes) of one root move, or None if its search was abandoned. A score
+    not above the alpha the search started with is only an upper bound (exact=False).
+    """
+    def stale() -> bool:
+        return _shared_generation.value != generation
+
+    if stale():
+        return None
+    search = Search(shape, evaluator, opponent_model, top_k, n, should_stop=stale,
+                    best_moves=_worker_best_moves.setdefault((shape, n), {}))
+    child = search._child(state, "A", mv)
+    with _shared_alpha.get_lock():
+        alpha = _shared_alpha.value if _shared_generation.value == generation else -INF
+    try:
+        v = search.value(child, turn_order(state), 1, depth - 1, alpha, INF)
+    except SearchAborted:
+        return None
+    with _shared_alpha.get_lock():
+        if _shared_generation.value == generation and v > _shared_alpha.value:
+            _shared_alpha.value = v
+    return v, v > alpha, search.nodes + search.leaves
+
+
+class ParallelSearch:
+    """
+    Root-split search: A's root moves are searched concurrently by a pool of `workers`
+    processes, best depth-1 score first, all sharing the best root score so far as their
+    alpha bound. Results are merged as they arrive; with a `time_budget` the best move
+    among the root moves finished in time is returned. Only exact scores are merged:
+    a move searched against an alpha it could not beat returns an upper bound, and the
+    move that set that alpha may not have been collected before the deadline.
+
+    The pool workers are child processes, so a ParallelSearch cannot be created inside
+    a daemonic process such as a `multiprocessing.Pool` worker (launcher.py, or
+    `client.run(processes > 1)`); that raises a RuntimeError, and callers there should
+    use the sequential `Search` instead.
+
+    The pool is kept across calls (create one per agent process and `close()` it, and
+    `warm_up()` it before the first timed move); only one `root_scores` call may run on
+    a pool at a time. When the budget runs out the search is marked stale: running root
+    searches abort within `Search.STOP_CHECK_NODES` nodes and queued ones return at once.
+    """
+
+    def __init__(self, shape: str, workers: int, evaluator=DEFAULT_EVALUATOR, opponent_model=None,
+                 top_k: Optional[int] = None, n: int = N):
+        self.shape = shape
+        self.n = n
+        self.workers = workers
+        self.evaluator = evaluator
+        self.opponent_model = opponent_model
+        self.top_k = top_k
+        self.nodes = 0
+        if multiprocessing.current_process().daemon:
+            raise RuntimeError("ParallelSearch cannot start worker processes from a daemonic process "
+                               "(e.g. a multiprocessing.Pool worker); use Search there")
+        ctx = multiprocessing.get_context()
+        self._alpha = ctx.Value("d", -INF)
+        self._generation = ctx.Value("q", 0, lock=False)
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=ctx, initializer=_init_worker, initargs=(self._alpha, self._generation),
+        )
+
+    def root_scores(self, state: State, depth: int, time_budget: Optional[float] = None) -> Tuple[List, List[float]]:
+        """
+        Like Search.root_scores, except that moves without an exact score (cut off by
+        the shared alpha, or not finished within `time_budget` seconds) score -inf. If
+        no move has an exact score, the depth-1 scores are returned instead.
+        """
+        deadline = None if time_budget is None else monotonic() + time_budget
+        local = Search(self.shape, self.evaluator, self.opponent_model, self.top_k, self.n)
+        moves, shallow = local.root_scores(state, 1)
+        self.nodes += local.nodes + local.leaves
+        if depth <= 1 or not moves:
+            return moves, shallow
+
+        geo = local.geo
+        with self._alpha.get_lock():
+            self._generation.value += 1
+            self._alpha.value = -INF
+            generation = self._generation.value
+
+        # best depth-1 moves first, so the shared alpha rises early
+        ranked = sorted(range(len(moves)), key=lambda i: -shallow[i])
+        futures: Dict[Future, int] = {
+            self._pool.submit(
+                _score_root_move, state, self.shape, self.n, depth, from_server_move(geo, moves[i]), generation,
+                self.evaluator, self.opponent_model, self.top_k,
+            ): i
+            for i in ranked
+        }
+        scores = [-INF] * len(moves)
+        finished = 0
+        pending = set(futures)
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for fut in done:
+                res = fut.result()
+                if res is None:
+                    continue
+                v, exact, nodes = res
+                self.nodes += nodes
+                if exact:
+                    scores[futures[fut]] = v
+                    finished += 1
+
+        if pending:
+            # out of time: make the remaining root searches abort instead of finishing
+            with self._alpha.get_lock():
+                self._generation.value += 1
+            for fut in pending:
+                fut.cancel()
+        if finished == 0:
+            return moves, shallow
+        return moves, scores
+
+    def warm_up(self) -> None:
+        """Starts all worker processes now rather than on the first search."""
+        for fut in [self._pool.submit(_warm_up_worker) for _ in range(self.workers)]:
+            fut.result()
+
+    def choose_move(self, state: State, depth: int = 2, time_budget: Optional[float] = None):
+        moves, scores = self.root_scores(state, depth, time_budget)
+        if not moves:
+            raise RuntimeError("No legal moves for A")
+        best = max(range(len(moves)), key=lambda i: scores[i])
+        return moves[best]
+
+    def close(self) -> None:
+        # abort whatever is still running, then wait for the workers to exit
+        with self._alpha.get_lock():
+            self._generation.value += 1
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ParallelSearch":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
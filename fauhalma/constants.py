@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Set, Tuple, Literal
+from typing import Dict, FrozenSet, Set, Tuple, Literal
 
 # ---------- Types ----------
 Coord = Tuple[int, int]
@@ -16,7 +16,7 @@ DIRS: tuple[Coord, ...] = (
 
 CENTER: Coord = (0, 0)
 
-# Triangle side length: 1 + 2 + 3 = 6 pegs
+# Triangle side length: 1 + 2 + 3 = 6 pegs (default board size)
 N = 3
 
 
@@ -71,56 +71,93 @@ def _is_rhombus_cell(x: int, y: int, n: int = N) -> bool:
     return abs(cy) > n and abs(cx) <= n and abs(cz) <= n and a[2] <= 2 * n
 
 
-def _generate_valid(shape: Shape) -> Set[Coord]:
+def _generate_valid(shape: Shape, n: int = N) -> FrozenSet[Coord]:
+    is_cell = _is_star_cell if shape == "star" else _is_rhombus_cell
     valid: Set[Coord] = set()
-    for x in range(-2 * N, 2 * N + 1):
-        for y in range(-2 * N, 2 * N + 1):
+    for x in range(-2 * n, 2 * n + 1):
+        for y in range(-2 * n, 2 * n + 1):
             if (x, y) == CENTER:
                 continue
-            if shape == "star" and _is_star_cell(x, y):
+            if is_cell(x, y, n):
                 valid.add((x, y))
-            elif shape == "rhombus" and _is_rhombus_cell(x, y):
-                valid.add((x, y))
-    return valid
+    return frozenset(valid)
 
 
-# ---------- Valid boards ----------
-VALID_STAR: Set[Coord] = _generate_valid("star")
-VALID_RHOMBUS: Set[Coord] = _generate_valid("rhombus")
+# ---------- START / HOME (rule-correct) ----------
+# Corners:
+#   y < -n -> bottom
+#   x < -n -> top-left
+#   z < -n -> top-right  (z = -x - y)
+def _generate_corners(n: int = N) -> Tuple[Dict[str, FrozenSet[Coord]], Dict[str, FrozenSet[Coord]]]:
+    star = _generate_valid("star", n)
+    start = {
+        "A": frozenset(c for c in star if c[1] < -n),
+        "B": frozenset(c for c in star if c[0] < -n),
+        "C": frozenset(c for c in star if (-c[0] - c[1]) < -n),
+    }
+    # HOME is exactly opposite corner of START
+    home = {p: frozenset(_opposite(c) for c in start[p]) for p in start}
+    return start, home
 
 
-def valid_cells_for_shape(shape: Shape) -> Set[Coord]:
-    return VALID_STAR if shape == "star" else VALID_RHOMBUS
+# ---------- Board sizes ----------
+def star_size(n: int = N) -> int:
+    # inner hexagon of radius n (minus the removed center) plus six triangles of n(n+1)/2
+    return 3 * n * (n + 1) + 6 * corner_size(n)
 
 
-# ---------- START / HOME (rule-correct) ----------
-# Corners:
-#   y < -N -> bottom
-#   x < -N -> top-left
-#   z < -N -> top-right  (z = -x - y)
-
-START: Dict[str, Set[Coord]] = {
-    "A": {c for c in VALID_STAR if c[1] < -N},
-    "B": {c for c in VALID_STAR if c[0] < -N},
-    "C": {c for c in VALID_STAR if (-c[0] - c[1]) < -N},
-}
+def rhombus_size(n: int = N) -> int:
+    return 3 * n * (n + 1) + 2 * corner_size(n)
+
+
+def corner_size(n: int = N) -> int:
+    return n * (n + 1) // 2
 
-# HOME is exactly opposite corner of START
-HOME: Dict[str, Set[Coord]] = {
-    "A": {_opposite(c) for c in START["A"]},
-    "B": {_opposite(c) for c in START["B"]},
-    "C": {_opposite(c) for c in START["C"]},
+
+# ---------- Valid boards ----------
+# The geometry for a (shape, n) pair is built on first use and cached, see geometry.py.
+# VALID_STAR, VALID_RHOMBUS, START and HOME refer to the default N and are resolved
+# lazily through the module __getattr__ below.
+def valid_cells_for_shape(shape: Shape, n: int = N) -> FrozenSet[Coord]:
+    from .geometry import get_geometry
+    return get_geometry(shape, n).valid
+
+
+def home_cells(n: int = N) -> Dict[str, FrozenSet[Coord]]:
+    from .geometry import get_geometry
+    return get_geometry("star", n).home
+
+
+_LAZY_GEOMETRY = {
+    "VALID_STAR": ("star", "valid"),
+    "VALID_RHOMBUS": ("rhombus", "valid"),
+    "START": ("star", "start"),
+    "HOME": ("star", "home"),
 }
 
 
-# ---------- Sanity checks ----------
-def validate_constants() -> None:
-    assert CENTER not in VALID_STAR
-    assert CENTER not in VALID_RHOMBUS
+def __getattr__(name: str):
+    if name not in _LAZY_GEOMETRY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from .geometry import get_geometry
+    shape, attr = _LAZY_GEOMETRY[name]
+    return getattr(get_geometry(shape, N), attr)
 
-    assert len(VALID_STAR) == 72, f"Expected 72 star cells, got {len(VALID_STAR)}"
-    assert len(VALID_RHOMBUS) == 48, f"Expected 48 rhombus cells, got {len(VALID_RHOMBUS)}"
 
-    # Each corner must have exactly 6 cells
-    assert all(len(START[p]) == 6 for p in "ABC"), {p: len(START[p]) for p in "ABC"}
-    assert all(len(HOME[p]) == 6 for p in "ABC"), {p: len(HOME[p]) for p in "ABC"}
\ No newline at end of file
+# ---------- Sanity checks ----------
+def validate_constants(n: int = N) -> None:
+    from .geometry import get_geometry
+    star = get_geometry("star", n)
+    rhombus = get_geometry("rhombus", n)
+
+    assert CENTER not in star.valid
+    assert CENTER not in rhombus.valid
+
+    assert len(star.valid) == star_size(n), f"Expected {star_size(n)} star cells, got {len(star.valid)}"
+    assert len(rhombus.valid) == rhombus_size(n), \
+        f"Expected {rhombus_size(n)} rhombus cells, got {len(rhombus.valid)}"
+
+    # Each corner must have exactly n(n+1)/2 cells
+    k = corner_size(n)
+    assert all(len(star.start[p]) == k for p in "ABC"), {p: len(star.start[p]) for p in "ABC"}
+    assert all(len(star.home[p]) == k for p in "ABC"), {p: len(star.home[p]) for p in "ABC"}
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from pathlib import Path
+from typing import AbstractSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .constants import N, home_cells
+from .geometry import get_geometry
+from .jump_distance import JumpDistance, jump_distances
+from .moves import jump_targets, occupancy
+from .state import State, Coord
+
+
+# ---------- Features ----------
+# All features are from the point of view of `player` (the agent is always A).
+FEATURES: Tuple[str, ...] = (
+    "dist_sum",           # sum of hex distances to home
+    "jump_dist_sum",      # sum of jump-aware distances to home (see jump_distance.py)
+    "straggler",          # hex distance of the peg furthest from home
+    "pegs_in_home",
+    "jump_opportunities", # legal jumps that reduce the mover's distance to home
+    "leader_gap",         # best opponent dist_sum minus own dist_sum (as in greedy_agent)
+)
+
+_NO_OPPONENT_DIST = 10**3
+
+
+def _home_array(player: str, n: int) -> np.ndarray:
+    return np.array(sorted(home_cells(n)[player]), dtype=np.int64)
+
+
+def _peg_array(states: Sequence[State], player: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(n, k, 2) peg coordinates padded to the largest peg count, plus (n, k) mask of real pegs."""
+    k = max((len(s.pegs.get(player, ())) for s in states), default=0)
+    coords = np.zeros((len(states), max(k, 1), 2), dtype=np.int64)
+    mask = np.zeros((len(states), max(k, 1)), dtype=bool)
+    for i, s in enumerate(states):
+        pegs = s.pegs.get(player, ())
+        if pegs:
+            coords[i, :len(pegs)] = pegs
+            mask[i, :len(pegs)] = True
+    return coords, mask
+
+
+def _dist_to_home(coords: np.ndarray, home: np.ndarray) -> np.ndarray:
+    """(n, k) hex distance of each peg to the nearest home cell."""
+    d = coords[:, :, None, :] - home[None, None, :, :]
+    dz = -d[..., 0] - d[..., 1]
+    return np.maximum(np.maximum(np.abs(d[..., 0]), np.abs(d[..., 1])), np.abs(dz)).min(axis=2)
+
+
+def _dist_sums(states: Sequence[State], player: str, n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    coords, mask = _peg_array(states, player)
+    dist = np.where(mask, _dist_to_home(coords, _home_array(player, n)), 0)
+    return dist.sum(axis=1), dist.max(axis=1), mask.any(axis=1)
+
+
+@lru_cache(maxsize=65536)
+def _cached_forward_jumps(shape: str, player: str, n: int, key: Tuple[Tuple[Coord, ...], ...]) -> int:
+    geo = get_geometry(shape, n)
+    state = State({p: coords for p, coords in zip("ABC", key)})
+    owner = occupancy(state, geo)
+    dist = geo.home_dist[player]
+    count = 0
+    for c in state.pegs.get(player, ()):
+        s = geo.index[c]
+        for t in jump_targets(geo, owner, player, s):
+            if dist[t] < dist[s]:
+                count += 1
+    return count
+
+
+def _forward_jumps(state: State, player: str, shape: str, n: int) -> int:
+    return _cached_forward_jumps(shape, player, n, tuple(state.pegs.get(p, ()) for p in "ABC"))
+
+
+def _jump_dist_sums(states: Sequence[State], player: str, shape: str, n: int) -> List[int]:
+    # The leaves of one batch are usually siblings, so one JumpDistance is carried from
+    # state to state and only the pegs whose search read a changed cell are redone.
+    if len(states) == 1:
+        return [sum(jump_distances(states[0], player, shape, n))]
+    jd = JumpDistance(states[0], player, shape, n)
+    out = []
+    for s in states:
+        jd.update(s)
+        out.append(jd.total())
+    return out
+
+
+def extract_features(
+    states: Sequence[State],
+    shape: str,
+    player: str = "A",
+    n: int = N,
+    used: Optional[AbstractSet[str]] = None,
+) -> np.ndarray:
+    """
+    Feature matrix of shape (len(states), len(FEATURES)), dtype float64. With `used`,
+    only the named features are computed and the other columns are left at 0.
+    """
+    X = np.zeros((len(states), len(FEATURES)), dtype=np.float64)
+    if not states:
+        return X
+
+    def want(name: str) -> bool:
+        return used is None or name in used
+
+    own_sum, own_max, _ = _dist_sums(states, player, n)
+    home = home_cells(n)[player]
+
+    leader = np.full(len(states), _NO_OPPONENT_DIST, dtype=np.int64)
+    for opp in "ABC":
+        if opp == player:
+            continue
+        opp_sum, _, present = _dist_sums(states, opp, n)
+        leader = np.where(present, np.minimum(leader, opp_sum), leader)
+
+    X[:, 0] = own_sum
+    if want("jump_dist_sum"):
+        X[:, 1] = _jump_dist_sums(states, player, shape, n)
+    X[:, 2] = own_max
+    if want("pegs_in_home"):
+        X[:, 3] = [sum(1 for c in s.pegs.get(player, ()) if c in home) for s in states]
+    if want("jump_opportunities"):
+        X[:, 4] = [_forward_jumps(s, player, shape, n) for s in states]
+    X[:, 5] = leader - own_sum
+    return X
+
+
+# ---------- Models ----------
+class LinearEvaluator:
+    """score = X @ w + b, higher is better for the player the features were built for."""
+
+    shared_across_runs = True  # one instance serves every run (see client.deep_sizeof)
+
+    def __init__(self, weights: np.ndarray, bias: float = 0.0):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+
+    @property
+    def used_features(self) -> frozenset:
+        return frozenset(name for name, w in zip(FEATURES, self.weights) if w != 0.0)
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        return X @ self.weights + self.bias
+
+    def evaluate(self, states: Sequence[State], shape: str, player: str = "A", n: int = N) -> np.ndarray:
+        return self.score(extract_features(states, shape, player, n, self.used_features))
+
+    def save(self, path: str | Path) -> None:
+        np.savez(path, kind="linear", weights=self.weights, bias=self.bias)
+
+
+class MLPEvaluator:
+    """One hidden ReLU layer over standardised features."""
+
+    shared_across_runs = True
+
+    def __init__(self, w1: np.ndarray, b1: np.ndarray, w2: np.ndarray, b2: float,
+                 mean: np.ndarray, std: np.ndarray):
+        self.w1 = np.asarray(w1, dtype=np.float64)
+        self.b1 = np.asarray(b1, dtype=np.float64)
+        self.w2 = np.asarray(w2, dtype=np.float64)
+        self.b2 = float(b2)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.asarray(std, dtype=np.float64)
+
+    @property
+    def used_features(self) -> frozenset:
+        return frozenset(name for name, row in zip(FEATURES, self.w1) if np.any(row != 0.0))
+
+    def score(self, X: np.ndarray) -> np.ndarray:
+        h = np.maximum((X - self.mean) / self.std @ self.w1 + self.b1, 0.0)
+        return h @ self.w2 + self.b2
+
+    def evaluate(self, states: Sequence[State], shape: str, player: str = "A", n: int = N) -> np.ndarray:
+        return self.score(extract_features(states, shape, player, n, self.used_features))
+
+    def save(self, path: str | Path) -> None:
+        np.savez(path, kind="mlp", w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2,
+                 mean=self.mean, std=self.std)
+
+
+# Hand-tuned weights mirroring the greedy agent's formula (used when no trained model is given)
+DEFAULT_EVALUATOR = LinearEvaluator(np.array([-110.0, 0.0, 0.0, 100.0, 0.0, 55.0]))
+
+
+def load_evaluator(path: str | Path) -> LinearEvaluator | MLPEvaluator:
+    data = np.load(path)
+    kind = str(data["kind"])
+    if kind == "linear":
+        return LinearEvaluator(data["weights"], float(data["bias"]))
+    if kind == "mlp":
+        return MLPEvaluator(data["w1"], data["b1"], data["w2"], float(data["b2"]),
+                            data["mean"], data["std"])
+    raise ValueError(f"Unknown evaluator kind '{kind}' in {path}")
+
+
+# ---------- Offline training ----------
+def training_set(runs: Iterable[List[State]], shape: str, player: str = "A") -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Builds (X, y) from recorded runs. The target is minus the number of moves `player`
+    still had to make: the moves left in the log plus the jump-aware distance of the
+    last recorded position (the log stops before our final move, or the run was lost).
+    """
+    Xs: List[np.ndarray] = []
+    ys: List[np.ndarray] = []
+    for states in runs:
+        if not states:
+            continue
+        tail = sum(jump_distances(states[-1], player, shape))
+        Xs.append(extract_features(states, shape, player))
+        ys.append(-(np.arange(len(states), 0, -1, dtype=np.float64) - 1 + tail))
+    if not Xs:
+        return np.zeros((0, len(FEATURES))), np.zeros(0)
+    return np.vstack(Xs), np.concatenate(ys)
+
+
+def fit_linear(X: np.ndarray, y: np.ndarray, l2: float = 1e-3) -> LinearEvaluator:
+    """Ridge regression (the bias is not regularised)."""
+    A = np.hstack([X, np.ones((len(X), 1))])
+    reg = l2 * np.eye(A.shape[1])
+    reg[-1, -1] = 0.0
+    w = np.linalg.solve(A.T @ A + reg, A.T @ y)
+    return LinearEvaluator(w[:-1], w[-1])
+
+
+def fit_mlp(X: np.ndarray, y: np.ndarray, hidden: int = 16, epochs: int = 500,
+            lr: float = 1e-2, seed: Optional[int] = 0) -> MLPEvaluator:
+    """Full-batch gradient descent on mean squared error."""
+    rng = np.random.default_rng(seed)
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    Z = (X - mean) / std
+
+    w1 = rng.normal(0.0, 1.0 / np.sqrt(Z.shape[1]), (Z.shape[1], hidden))
+    b1 = np.zeros(hidden)
+    w2 = rng.normal(0.0, 1.0 / np.sqrt(hidden), hidden)
+    b2 = float(y.mean()) if len(y) else 0.0
+
+    for _ in range(epochs):
+        pre = Z @ w1 + b1
+        h = np.maximum(pre, 0.0)
+        err = h @ w2 + b2 - y
+        g_out = 2.0 * err / len(y)
+        g_w2 = h.T @ g_out
+        g_b2 = g_out.sum()
+        g_h = np.outer(g_out, w2) * (pre > 0)
+        g_w1 = Z.T @ g_h
+        g_b1 = g_h.sum(axis=0)
+        w1 -= lr * g_w1
+        b1 -= lr * g_b1
+        w2 -= lr * g_w2
+        b2 -= lr * g_b2
+
+    return MLPEvaluator(w1, b1, w2, b2, mean, std)
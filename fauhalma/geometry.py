@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+from .constants import DIRS, N, Coord, Shape, _generate_corners, _generate_valid
+from .heuristics import hex_distance
+
+
+# ---------- Board geometry per (shape, n) ----------
+# Cells are numbered 0..len(cells)-1 so sets of cells can be stored as int bitsets.
+@dataclass(frozen=True)
+class Geometry:
+    shape: Shape
+    n: int
+    valid: FrozenSet[Coord]
+    cells: Tuple[Coord, ...]
+    index: Dict[Coord, int]
+    # START / HOME corners are defined on the star and shared by both shapes
+    start: Dict[str, FrozenSet[Coord]]
+    home: Dict[str, FrozenSet[Coord]]
+    # neighbours[i] -> indices of the adjacent valid cells
+    neighbours: Tuple[Tuple[int, ...], ...]
+    # rays[i][d] -> indices of the valid cells s+d, s+2d, ... (stops at the board edge / center)
+    rays: Tuple[Tuple[Tuple[int, ...], ...], ...]
+    # reach[i] -> bitset of every cell whose occupancy a move out of i depends on
+    reach: Tuple[int, ...]
+    # home cells that are on this board, as bitsets
+    home_mask: Dict[str, int]
+    # home_dist[player][i] -> hex distance from cell i to the nearest cell of player's home
+    home_dist: Dict[str, Tuple[int, ...]]
+
+    # cached per process and used by every run (see client.deep_sizeof); not a field
+    shared_across_runs = True
+
+    def mask(self, coords: Iterable[Coord]) -> int:
+        m = 0
+        for c in coords:
+            m |= 1 << self.index[c]
+        return m
+
+
+def iter_bits(mask: int):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# ---------- Snapshots ----------
+# Built geometries can be pickled per (shape, n) with `python -m fauhalma.geometry`, so
+# worker processes load them instead of rebuilding. Snapshots are keyed on a hash of the
+# sources that define the tables, so any edit to them makes old snapshots unreachable.
+SNAPSHOT_DIR = Path(os.environ.get("FAUHALMA_SNAPSHOT_DIR", Path(__file__).with_name("_snapshots")))
+_SOURCES = ("geometry.py", "constants.py", "heuristics.py")
+
+
+@lru_cache(maxsize=None)
+def source_fingerprint() -> str:
+    h = hashlib.sha256()
+    for name in _SOURCES:
+        h.update(Path(__file__).with_name(name).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def _field_names() -> Tuple[str, ...]:
+    return tuple(f.name for f in fields(Geometry))
+
+
+def snapshot_path(shape: Shape, n: int) -> Path:
+    return SNAPSHOT_DIR / f"geometry-{source_fingerprint()}-{shape}-{n}.pickle"
+
+
+def _load_snapshot(shape: Shape, n: int) -> Optional[Geometry]:
+    try:
+        with snapshot_path(shape, n).open("rb") as f:
+            fingerprint, names, geo = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError, TypeError):
+        return None
+    if fingerprint != source_fingerprint() or tuple(names) != _field_names() or not isinstance(geo, Geometry) \
+            or any(not hasattr(geo, name) for name in names) or (geo.shape, geo.n) != (shape, n):
+        return None
+    return geo
+
+
+def write_snapshot(geo: Geometry) -> Path:
+    """Atomically writes the snapshot for `geo` (readers never see a partial file)."""
+    path = snapshot_path(geo.shape, geo.n)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((source_fingerprint(), _field_names(), geo), f, protocol=pickle.HIGHEST_PROTOCOL)
+        # mkstemp creates 0600; workers may run as another user than whoever generated it
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return path
+
+
+# Geometries handed over by a parent process (see install_geometry).
+_INSTALLED: Dict[Tuple[Shape, int], Geometry] = {}
+
+
+def install_geometry(*geos: Geometry) -> None:
+    """
+    Makes already built geometries available to get_geometry. Meant as a process pool
+    initializer, so workers started with the spawn method reuse the parent's tables
+    instead of rebuilding them.
+    """
+    for geo in geos:
+        _INSTALLED[(geo.shape, geo.n)] = geo
+    get_geometry.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_geometry(shape: Shape, n: int = N) -> Geometry:
+    """
+    Geometry for (shape, n), cached per process. Taken from install_geometry if it was
+    handed over, else loaded from a current snapshot if one was generated, otherwise
+    built. Never writes snapshots. Set FAUHALMA_NO_SNAPSHOT=1 to skip the snapshot.
+    """
+    if (shape, n) in _INSTALLED:
+        return _INSTALLED[(shape, n)]
+    if not os.environ.get("FAUHALMA_NO_SNAPSHOT"):
+        geo = _load_snapshot(shape, n)
+        if geo is not None:
+            return geo
+    return build_geometry(shape, n)
+
+
+def build_geometry(shape: Shape, n: int = N) -> Geometry:
+    valid = _generate_valid(shape, n)
+    start, home = _generate_corners(n)
+    cells = tuple(sorted(valid))
+    index = {c: i for i, c in enumerate(cells)}
+
+    neighbours = []
+    rays = []
+    reach = []
+    for (x, y) in cells:
+        nbs = []
+        cell_rays = []
+        m = 0
+        for dx, dy in DIRS:
+            ray = []
+            k = 1
+            while (x + dx * k, y + dy * k) in valid:
+                ray.append(index[(x + dx * k, y + dy * k)])
+                k += 1
+            if ray:
+                nbs.append(ray[0])
+            for j in ray:
+                m |= 1 << j
+            cell_rays.append(tuple(ray))
+        neighbours.append(tuple(nbs))
+        rays.append(tuple(cell_rays))
+        reach.append(m)
+
+    home_mask = {
+        p: sum(1 << index[c] for c in home[p] if c in index)
+        for p in home
+    }
+
+    home_dist = {
+        p: tuple(min(hex_distance(c, h) for h in home[p]) for c in cells)
+        for p in home
+    }
+
+    return Geometry(
+        shape=shape,
+        n=n,
+        valid=valid,
+        cells=cells,
+        index=index,
+        start=start,
+        home=home,
+        neighbours=tuple(neighbours),
+        rays=tuple(rays),
+        reach=tuple(reach),
+        home_mask=home_mask,
+        home_dist=home_dist,
+    )
+
+
+if __name__ == "__main__":
+    # python -m fauhalma.geometry [n ...]  -- generate the snapshots for the current sources
+    # (through the package module, so the pickles reference fauhalma.geometry.Geometry)
+    from fauhalma import geometry
+
+    for size in [int(a) for a in sys.argv[1:]] or [N]:
+        for board in ("star", "rhombus"):
+            print(geometry.write_snapshot(geometry.build_geometry(board, size)))
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .constants import N
+from .geometry import Geometry, get_geometry, iter_bits
+from .heuristics import dist_to_set
+from .state import State, Coord
+
+
+def _landable(owner: List[Optional[str]], home_mask: int, player: str, i: int) -> bool:
+    o = owner[i]
+    if o is None:
+        return True
+    return bool(home_mask >> i & 1) and o != player
+
+
+def _bfs_to_home(
+    tables: Geometry,
+    owner: List[Optional[str]],
+    player: str,
+    peg: int,
+) -> Tuple[Optional[int], int]:
+    """
+    Multi-source BFS backwards from the free home cells to `peg`.
+
+    `owner` must already have `peg` removed. Every move in FAUhalma is reversible
+    while the other pegs stand still (a jump's intermediate pattern is symmetric),
+    so the backward distance equals the number of moves the peg needs.
+
+    Returns (distance or None if unreachable, bitset of cells whose occupancy was read).
+    """
+    home_mask = tables.home_mask[player]
+    target = 1 << peg
+    if home_mask & target:
+        return 0, home_mask
+
+    frontier = 0
+    for i in iter_bits(home_mask):
+        if _landable(owner, home_mask, player, i):
+            frontier |= 1 << i
+    seen = frontier
+    touched = home_mask
+    dist = 0
+
+    neighbours = tables.neighbours
+    rays = tables.rays
+    reach = tables.reach
+
+    while frontier:
+        if frontier & target:
+            return dist, touched
+        nxt = 0
+        for i in iter_bits(frontier):
+            touched |= reach[i]
+            for j in neighbours[i]:
+                if not (seen >> j & 1) and _landable(owner, home_mask, player, j):
+                    nxt |= 1 << j
+            for ray in rays[i]:
+                seq: List[Optional[str]] = []
+                for k in range(1, len(ray)):
+                    seq.append(owner[ray[k - 1]])
+                    j = ray[k]
+                    if seen >> j & 1:
+                        continue
+                    if any(x is not None for x in seq) and seq == seq[::-1] \
+                            and _landable(owner, home_mask, player, j):
+                        nxt |= 1 << j
+        nxt &= ~seen
+        seen |= nxt
+        frontier = nxt
+        dist += 1
+
+    return None, touched
+
+
+class JumpDistance:
+    """
+    Minimum number of moves (adjacent steps and jumps) each peg of `player` needs
+    to reach its home, assuming every other peg stays where it is.
+
+    Per-peg results are cached together with the set of cells their BFS looked at,
+    so after `move(...)` or `update(...)` only the pegs whose search read a changed
+    cell are redone.
+    """
+
+    def __init__(self, state: State, player: str, shape: str, n: int = N):
+        self.tables = get_geometry(shape, n)
+        self.player = player
+        self.owner: List[Optional[str]] = [None] * len(self.tables.cells)
+        for p, coords in state.pegs.items():
+            for c in coords:
+                self.owner[self.tables.index[c]] = p
+        self.pegs: List[int] = [self.tables.index[c] for c in state.pegs.get(player, ())]
+        self._dist: Dict[int, int] = {}
+        self._touched: Dict[int, int] = {}
+
+    def _compute(self, peg: int) -> int:
+        owner = self.owner
+        saved = owner[peg]
+        owner[peg] = None
+        try:
+            d, touched = _bfs_to_home(self.tables, owner, self.player, peg)
+        finally:
+            owner[peg] = saved
+        if d is None:
+            # blocked in: fall back to the plain hex distance
+            d = dist_to_set(self.tables.cells[peg], self.tables.home[self.player])
+        self._dist[peg] = d
+        self._touched[peg] = touched
+        return d
+
+    def distance(self, c: Coord) -> int:
+        i = self.tables.index[c]
+        if i in self._dist:
+            return self._dist[i]
+        return self._compute(i)
+
+    def distances(self) -> Tuple[int, ...]:
+        return tuple(self._dist[i] if i in self._dist else self._compute(i) for i in self.pegs)
+
+    def total(self) -> int:
+        return sum(self.distances())
+
+    def move(self, s: Coord, t: Coord) -> None:
+        """Update for a move s -> t by any player (including the swap rule)."""
+        idx = self.tables.index
+        si, ti = idx[s], idx[t]
+        mover = self.owner[si]
+        landed = self.owner[ti]
+        self.owner[ti] = mover
+        self.owner[si] = landed  # None, or the swapped opponent peg
+
+        if mover == self.player:
+            self.pegs[self.pegs.index(si)] = ti
+        elif landed == self.player:
+            self.pegs[self.pegs.index(ti)] = si
+
+        self._invalidate((1 << si) | (1 << ti))
+
+    def update(self, state: State) -> None:
+        """Switch to another position, e.g. a sibling leaf that differs by a few moves."""
+        index = self.tables.index
+        owner: List[Optional[str]] = [None] * len(self.tables.cells)
+        for p, coords in state.pegs.items():
+            for c in coords:
+                owner[index[c]] = p
+        changed = 0
+        for i, (old, new) in enumerate(zip(self.owner, owner)):
+            if old != new:
+                changed |= 1 << i
+        self.owner = owner
+        self.pegs = [index[c] for c in state.pegs.get(self.player, ())]
+        if changed:
+            self._invalidate(changed)
+
+    def _invalidate(self, changed: int) -> None:
+        for i in list(self._dist):
+            if changed >> i & 1 or self._touched[i] & changed:
+                del self._dist[i]
+                del self._touched[i]
+
+
+@lru_cache(maxsize=4096)
+def _cached_jump_distances(shape: str, player: str, n: int, key: Tuple[Tuple[Coord, ...], ...]) -> Tuple[int, ...]:
+    state = State({p: coords for p, coords in zip("ABC", key)})
+    return JumpDistance(state, player, shape, n).distances()
+
+
+def jump_distances(state: State, player: str, shape: str, n: int = N) -> Tuple[int, ...]:
+    """Jump-aware distance to home for each peg of `player`, in `state.pegs[player]` order."""
+    key = tuple(state.pegs.get(p, ()) for p in "ABC")
+    return _cached_jump_distances(shape, player, n, key)
+
+
+def total_jump_distance(state: State, player: str, shape: str, n: int = N) -> int:
+    return sum(jump_distances(state, player, shape, n))
@@ -1,8 +1,9 @@
 from __future__ import annotations
-from typing import List, Tuple, Dict, Set
+from typing import Iterator, List, Optional, Tuple, Dict, Set
 
 from .state import State, Coord
-from .constants import DIRS, CENTER, HOME, valid_cells_for_shape
+from .constants import DIRS, CENTER, N, home_cells, valid_cells_for_shape
+from .geometry import Geometry, get_geometry
 
 EMPTY = " "
 
@@ -45,14 +46,14 @@ def points_between(s: Coord, t: Coord, d: Coord) -> List[Coord]:
     return pts
 
 
-def _landing_is_free_or_swappable(occ: Dict[Coord, str], player: str, t: Coord) -> bool:
+def _landing_is_free_or_swappable(occ: Dict[Coord, str], player: str, t: Coord, n: int = N) -> bool:
     landing = occ.get(t, EMPTY)
     if landing == EMPTY:
         return True
-    return (t in HOME[player]) and (landing != player)
+    return (t in home_cells(n)[player]) and (landing != player)
 
 
-def legal_adjacent_moves(state: State, player: str, valid: Set[Coord]) -> List[List[List[int]]]:
+def legal_adjacent_moves(state: State, player: str, valid: Set[Coord], n: int = N) -> List[List[List[int]]]:
     occ = state.occupied_map()
     moves: List[List[List[int]]] = []
     for s in state.pegs.get(player, ()):
@@ -62,13 +63,13 @@ def legal_adjacent_moves(state: State, player: str, valid: Set[Coord]) -> List[L
             t = _add(s, d)
             if t == CENTER or t not in valid:
                 continue
-            if not _landing_is_free_or_swappable(occ, player, t):
+            if not _landing_is_free_or_swappable(occ, player, t, n):
                 continue
             moves.append([[s[0], s[1]], [t[0], t[1]]])
     return moves
 
 
-def legal_jump_moves(state: State, player: str, valid: Set[Coord]) -> List[List[List[int]]]:
+def legal_jump_moves(state: State, player: str, valid: Set[Coord], n: int = N) -> List[List[List[int]]]:
     occ = state.occupied_map()
     moves: List[List[List[int]]] = []
 
@@ -91,7 +92,7 @@ def legal_jump_moves(state: State, player: str, valid: Set[Coord]) -> List[List[
                 seq = [occ.get(p, EMPTY) for p in between]
 
                 if any(x != EMPTY for x in seq) and seq == list(reversed(seq)):
-                    if _landing_is_free_or_swappable(occ, player, t):
+                    if _landing_is_free_or_swappable(occ, player, t, n):
                         moves.append([[s[0], s[1]], [t[0], t[1]]])
 
                 k += 1
@@ -99,6 +100,122 @@ def legal_jump_moves(state: State, player: str, valid: Set[Coord]) -> List[List[
     return moves
 
 
-def legal_moves(state: State, player: str, shape: str) -> List[List[List[int]]]:
-    valid = valid_cells_for_shape(shape)
-    return legal_adjacent_moves(state, player, valid) + legal_jump_moves(state, player, valid)
+def legal_moves(state: State, player: str, shape: str, n: int = N) -> List[List[List[int]]]:
+    valid = valid_cells_for_shape(shape, n)
+    return legal_adjacent_moves(state, player, valid, n) + legal_jump_moves(state, player, valid, n)
+
+
+# ---------- Lazy, ordered move generation ----------
+# Moves are (from_idx, to_idx) pairs of cell indices into get_geometry(shape, n).cells;
+# convert with to_server_move(...) only when the move is sent to the server.
+IdxMove = Tuple[int, int]
+
+
+def occupancy(state: State, geo: Geometry) -> List[Optional[str]]:
+    owner: List[Optional[str]] = [None] * len(geo.cells)
+    for p, coords in state.pegs.items():
+        for c in coords:
+            owner[geo.index[c]] = p
+    return owner
+
+
+def to_server_move(geo: Geometry, mv: IdxMove) -> List[List[int]]:
+    (sx, sy), (tx, ty) = geo.cells[mv[0]], geo.cells[mv[1]]
+    return [[sx, sy], [tx, ty]]
+
+
+def from_server_move(geo: Geometry, move_json) -> IdxMove:
+    (sx, sy), (tx, ty) = move_json
+    return geo.index[(sx, sy)], geo.index[(tx, ty)]
+
+
+def jump_targets(geo: Geometry, owner: List[Optional[str]], player: str, s: int) -> Iterator[int]:
+    home_mask = geo.home_mask[player]
+    for ray in geo.rays[s]:
+        seq: List[Optional[str]] = []
+        for k in range(1, len(ray)):
+            seq.append(owner[ray[k - 1]])
+            t = ray[k]
+            landing = owner[t]
+            if landing is not None and not (home_mask >> t & 1 and landing != player):
+                continue
+            if any(x is not None for x in seq) and seq == seq[::-1]:
+                yield t
+
+
+def step_targets(geo: Geometry, owner: List[Optional[str]], player: str, s: int) -> Iterator[int]:
+    home_mask = geo.home_mask[player]
+    for t in geo.neighbours[s]:
+        landing = owner[t]
+        if landing is None or (home_mask >> t & 1 and landing != player):
+            yield t
+
+
+def is_legal_idx_move(geo: Geometry, owner: List[Optional[str]], player: str, mv: IdxMove) -> bool:
+    s, t = mv
+    if owner[s] != player:
+        return False
+    return t in step_targets(geo, owner, player, s) or t in jump_targets(geo, owner, player, s)
+
+
+def iter_moves(
+    state: State,
+    player: str,
+    shape: str,
+    n: int = N,
+    tt_move: Optional[IdxMove] = None,
+    owner: Optional[List[Optional[str]]] = None,
+) -> Iterator[IdxMove]:
+    """
+    Lazily yields the legal moves of `player` as (from_idx, to_idx) in search order:
+
+      1. `tt_move` (e.g. the best move from a transposition table), if still legal
+      2. forward jumps, longest progress towards home first
+      3. adjacent steps that enter home
+      4. everything else
+
+    Later stages are only generated if the consumer keeps iterating, so a search that
+    cuts off after the first few moves never builds the full move list.
+    """
+    geo = get_geometry(shape, n)
+    if owner is None:
+        owner = occupancy(state, geo)
+    dist = geo.home_dist[player]
+    home_mask = geo.home_mask[player]
+    pegs = [geo.index[c] for c in state.pegs.get(player, ())]
+
+    if tt_move is not None and is_legal_idx_move(geo, owner, player, tt_move):
+        yield tt_move
+    else:
+        tt_move = None
+
+    forward: List[Tuple[int, int, int]] = []
+    other_jumps: List[IdxMove] = []
+    for s in pegs:
+        for t in jump_targets(geo, owner, player, s):
+            gain = dist[s] - dist[t]
+            if gain > 0:
+                forward.append((-gain, s, t))
+            else:
+                other_jumps.append((s, t))
+    forward.sort()
+    for _gain, s, t in forward:
+        if (s, t) != tt_move:
+            yield s, t
+
+    rest: List[IdxMove] = []
+    for s in pegs:
+        s_home = home_mask >> s & 1
+        for t in step_targets(geo, owner, player, s):
+            if not s_home and home_mask >> t & 1:
+                if (s, t) != tt_move:
+                    yield s, t
+            else:
+                rest.append((s, t))
+
+    for mv in rest:
+        if mv != tt_move:
+            yield mv
+    for mv in other_jumps:
+        if mv != tt_move:
+            yield mv
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .constants import N, home_cells
+from .heuristics import dist_to_set, hex_distance
+from .moves import legal_moves
+from .state import State, Coord, apply_move
+
+Move = List[List[int]]
+
+# ---------- Move features ----------
+MOVE_FEATURES: Tuple[str, ...] = (
+    "progress",      # decrease of the mover's hex distance to its home
+    "jump_extra",    # jump length - 1 (0 for adjacent steps)
+    "enters_home",
+    "leaves_home",
+    "straggler",     # moves the peg that is furthest from home
+    "blocks_a",      # lands next to one of A's pegs
+)
+
+
+def move_features(state: State, player: str, moves: Sequence[Move], n: int = N) -> np.ndarray:
+    """(len(moves), len(MOVE_FEATURES)) feature matrix of `player`'s candidate moves."""
+    home = home_cells(n)[player]
+    own = state.pegs.get(player, ())
+    dists = {c: dist_to_set(c, home) for c in own}
+    worst = max(dists.values(), default=0)
+    a_pegs = state.pegs.get("A", ()) if player != "A" else ()
+
+    F = np.zeros((len(moves), len(MOVE_FEATURES)), dtype=np.float64)
+    for i, ((sx, sy), (tx, ty)) in enumerate(moves):
+        s: Coord = (sx, sy)
+        t: Coord = (tx, ty)
+        F[i, 0] = dists[s] - dist_to_set(t, home)
+        F[i, 1] = hex_distance(s, t) - 1
+        F[i, 2] = float(s not in home and t in home)
+        F[i, 3] = float(s in home and t not in home)
+        F[i, 4] = float(dists[s] == worst)
+        F[i, 5] = float(any(hex_distance(t, a) == 1 for a in a_pegs))
+    return F
+
+
+# ---------- Recovering opponent decisions from recorded percepts ----------
+def _single_move(before: State, after: State, player: str) -> Optional[Move]:
+    b = set(before.pegs.get(player, ()))
+    a = set(after.pegs.get(player, ()))
+    gone, new = b - a, a - b
+    if len(gone) != 1 or len(new) != 1:
+        return None
+    (s,), (t,) = gone, new
+    return [[s[0], s[1]], [t[0], t[1]]]
+
+
+def decisions_from_run(
+    states: Sequence[State], shape: str, order: Sequence[str], n: int = N,
+) -> List[Tuple[State, str, Move]]:
+    """
+    (state the opponent saw, opponent, move it played) for every turn that can be
+    reconstructed unambiguously from consecutive percepts. Turns involving a swap,
+    or where the players' moves cannot be told apart, are skipped.
+    """
+    out: List[Tuple[State, str, Move]] = []
+    for before, after in zip(states, states[1:]):
+        cur = before
+        for player in order:
+            mv = _single_move(before, after, player)
+            if mv is None or mv not in legal_moves(cur, player, shape, n):
+                break
+            if player != "A":
+                out.append((cur, player, mv))
+            cur = apply_move(cur, player, mv, n)
+    return out
+
+
+# ---------- Model ----------
+class OpponentModel:
+    """
+    Softmax policy per opponent: P(move) ~ exp(w_player . move_features(move)).
+    Fitted per env, because the server opponents are fixed policies of different strength.
+    """
+
+    shared_across_runs = True  # one model per env serves every run (see client.deep_sizeof)
+
+    def __init__(self, weights: Optional[Dict[str, np.ndarray]] = None):
+        self.weights: Dict[str, np.ndarray] = {
+            p: np.asarray(w, dtype=np.float64) for p, w in (weights or {}).items()
+        }
+        self._cache: Dict[Tuple, List[Move]] = {}
+
+    def __getstate__(self) -> dict:
+        # the reply cache is per process; don't ship it to search workers
+        return {"weights": self.weights}
+
+    def __setstate__(self, state: dict) -> None:
+        self.weights = state["weights"]
+        self._cache = {}
+
+    def scores(self, state: State, player: str, moves: Sequence[Move], n: int = N) -> np.ndarray:
+        w = self.weights.get(player)
+        if w is None or not moves:
+            return np.zeros(len(moves))
+        return move_features(state, player, moves, n) @ w
+
+    def likely_replies(self, state: State, player: str, shape: str, k: int, n: int = N) -> List[Move]:
+        """The `k` most likely moves of `player`, most likely first."""
+        key = (shape, n, player, k, tuple(state.pegs.get(p, ()) for p in "ABC"))
+        hit = self._cache.get(key)
+        if hit is not None:
+            return hit
+        moves = legal_moves(state, player, shape, n)
+        s = self.scores(state, player, moves, n)
+        top = [moves[i] for i in np.argsort(-s, kind="stable")[:k]]
+        if len(self._cache) > 100_000:
+            self._cache.clear()
+        self._cache[key] = top
+        return top
+
+    def to_json(self) -> dict:
+        return {"features": list(MOVE_FEATURES), "weights": {p: w.tolist() for p, w in self.weights.items()}}
+
+    @staticmethod
+    def from_json(data: dict) -> "OpponentModel":
+        if data.get("features") != list(MOVE_FEATURES):
+            raise ValueError("Opponent model was fitted with a different feature set")
+        return OpponentModel(data["weights"])
+
+
+def fit_opponent_model(
+    decisions: Iterable[Tuple[State, str, Move]],
+    shape: str,
+    epochs: int = 200,
+    lr: float = 0.1,
+    l2: float = 1e-3,
+    n: int = N,
+) -> OpponentModel:
+    """Maximum-likelihood conditional logit per opponent (full-batch gradient ascent)."""
+    per_player: Dict[str, List[Tuple[np.ndarray, int]]] = {}
+    for state, player, mv in decisions:
+        moves = legal_moves(state, player, shape, n)
+        per_player.setdefault(player, []).append((move_features(state, player, moves, n), moves.index(mv)))
+
+    weights: Dict[str, np.ndarray] = {}
+    for player, samples in per_player.items():
+        w = np.zeros(len(MOVE_FEATURES))
+        for _ in range(epochs):
+            grad = -l2 * w
+            for F, chosen in samples:
+                z = F @ w
+                p = np.exp(z - z.max())
+                p /= p.sum()
+                grad += (F[chosen] - p @ F) / len(samples)
+            w += lr * grad
+        weights[player] = w
+    return OpponentModel(weights)
+
+
+def prediction_accuracy(
+    model: OpponentModel,
+    decisions: Iterable[Tuple[State, str, Move]],
+    shape: str,
+    k: int,
+    n: int = N,
+) -> Tuple[float, float]:
+    """(top-1, top-k) hit rate of `model` on held-out decisions."""
+    total = top1 = topk = 0
+    for state, player, mv in decisions:
+        replies = model.likely_replies(state, player, shape, k, n)
+        total += 1
+        top1 += replies[:1] == [mv]
+        topk += mv in replies
+    return (top1 / total, topk / total) if total else (0.0, 0.0)
+
+
+def save_models(models: Dict[str, OpponentModel], path: str | Path) -> None:
+    Path(path).write_text(json.dumps({env: m.to_json() for env, m in models.items()}, indent=2))
+
+
+def load_models(path: str | Path) -> Dict[str, OpponentModel]:
+    return {env: OpponentModel.from_json(d) for env, d in json.loads(Path(path).read_text()).items()}
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .state import State
+
+
+class RunRecorder:
+    """
+    Appends every percept the agent receives to <log_dir>/<env>/<run_id>.jsonl,
+    one JSON object per line: {"act_no": ..., "position": {...}}.
+    """
+
+    def __init__(self, log_dir: str | Path):
+        self.log_dir = Path(log_dir)
+
+    def record(self, env: str, run_id: str, act_no: int, position: dict) -> None:
+        path = self.log_dir / env / f"{run_id}.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a") as f:
+            f.write(json.dumps({"act_no": act_no, "position": position}) + "\n")
+
+
+def load_run(path: str | Path) -> List[State]:
+    """States of one recorded run, ordered by action number."""
+    rows = [json.loads(line) for line in Path(path).read_text().splitlines() if line.strip()]
+    rows.sort(key=lambda r: r["act_no"])
+    return [State.from_position_dict(r["position"]) for r in rows]
+
+
+def iter_runs(log_dir: str | Path, env: Optional[str] = None) -> Iterator[Tuple[str, str, List[State]]]:
+    """Yields (env, run_id, states) for every recorded run (optionally of a single env)."""
+    root = Path(log_dir)
+    env_dirs = [root / env] if env is not None else sorted(p for p in root.iterdir() if p.is_dir())
+    for env_dir in env_dirs:
+        if not env_dir.is_dir():
+            continue
+        for path in sorted(env_dir.glob("*.jsonl")):
+            yield env_dir.name, path.stem, load_run(path)
@@ -2,6 +2,8 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, Tuple
 
+from fauhalma.constants import N, home_cells
+
 Coord = Tuple[int, int]
 
 @dataclass(frozen=True)
@@ -20,7 +22,7 @@ class State:
         return occ
 
 
-def apply_move(state: State, player: str, move_json):
+def apply_move(state: State, player: str, move_json, n: int = N):
     """
     Apply [[sx,sy],[tx,ty]] for player. Implements swap rule:
     If destination is in player's HOME and occupied by opponent -> swap.
@@ -41,8 +43,8 @@ def apply_move(state: State, player: str, move_json):
     landing_owner = occ.get(t, None)
 
     # swap rule
-    from fauhalma.constants import HOME
-    if landing_owner is not None and landing_owner != player and (t in HOME[player]):
+    home = home_cells(n)[player]
+    if landing_owner is not None and landing_owner != player and (t in home):
         pegs[landing_owner].remove(t)
         pegs[landing_owner].append(s)
 
@@ -0,0 +1,235 @@
+"""
+Runs several env configs from one supervisor process.
+
+    python launcher.py agent-configs/*.json [--processes 8] [--run-limit 60]
+
+All envs share one worker pool. The board geometry is built and validated once in the
+supervisor and handed to every worker by the pool initializer: with the fork start
+method (Linux) workers inherit it anyway, with spawn (macOS, Windows) they receive it
+pickled instead of rebuilding it. Pool slots are handed out by pending
+action requests: whenever a slot frees up, the env with the most queued requests per
+running task gets it.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Set, Tuple
+
+from client import RequestInfo, RequestProcessor, _get_agent_config, _run, _RunTracker, Action
+from fauhalma.constants import ENV_INFO, validate_constants
+from fauhalma.geometry import Geometry, get_geometry, install_geometry
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_call(fn: Callable[[Any, RequestInfo], Any], percept: Any, info: RequestInfo) -> Tuple[Any, float]:
+    t = time.perf_counter()
+    action = fn(percept, info)
+    return action, time.perf_counter() - t
+
+
+@dataclass
+class EnvStats:
+    actions: int = 0
+    compute_time: float = 0.0   # seconds spent in the agent function
+    wait_time: float = 0.0      # seconds from submission to result (queueing included)
+    runs_finished: int = 0
+    failures: int = 0           # agent calls that raised (the action is skipped)
+    outcomes: Counter = field(default_factory=Counter)
+    started: float = field(default_factory=time.perf_counter)
+
+    def summary(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        return (
+            f"{self.actions} actions ({self.actions / max(elapsed, 1e-9):.2f}/s), "
+            f"avg compute {self.compute_time / max(self.actions, 1) * 1e3:.1f} ms, "
+            f"avg latency {self.wait_time / max(self.actions, 1) * 1e3:.1f} ms, "
+            f"{self.failures} failed, {self.runs_finished} runs finished, outcomes {dict(self.outcomes)}"
+        )
+
+
+class Supervisor:
+    def __init__(self, agent_function: Callable[[Any, RequestInfo], Any], processes: int,
+                 geometries: Tuple[Geometry, ...] = ()):
+        self.agent_function = agent_function
+        self.processes = processes
+        self.pool = multiprocessing.Pool(processes=processes, initializer=install_geometry, initargs=geometries)
+        self.lock = threading.Lock()
+        self.pending: Dict[str, Deque[Tuple[Future, Any, RequestInfo, float]]] = {}
+        self.running: Dict[str, int] = {}
+        self.stats: Dict[str, EnvStats] = {}
+
+    def register(self, env: str) -> None:
+        with self.lock:
+            self.pending.setdefault(env, deque())
+            self.running.setdefault(env, 0)
+            self.stats.setdefault(env, EnvStats())
+
+    def submit(self, env: str, percept: Any, info: RequestInfo) -> Future:
+        fut: Future = Future()
+        with self.lock:
+            self.pending[env].append((fut, percept, info, time.perf_counter()))
+            self._dispatch()
+        return fut
+
+    def _dispatch(self) -> None:
+        # caller holds self.lock
+        while sum(self.running.values()) < self.processes:
+            candidates = [e for e, q in self.pending.items() if q]
+            if not candidates:
+                return
+            env = max(candidates, key=lambda e: len(self.pending[e]) / (self.running[e] + 1))
+            fut, percept, info, submitted = self.pending[env].popleft()
+            self.running[env] += 1
+            self.pool.apply_async(
+                _timed_call,
+                (self.agent_function, percept, info),
+                callback=lambda res, env=env, fut=fut, submitted=submitted: self._done(env, fut, submitted, res),
+                error_callback=lambda exc, env=env, fut=fut: self._failed(env, fut, exc),
+            )
+
+    def _done(self, env: str, fut: Future, submitted: float, res: Tuple[Any, float]) -> None:
+        action, seconds = res
+        with self.lock:
+            self.running[env] -= 1
+            st = self.stats[env]
+            st.actions += 1
+            st.compute_time += seconds
+            st.wait_time += time.perf_counter() - submitted
+            self._dispatch()
+        fut.set_result(action)
+
+    def _failed(self, env: str, fut: Future, exc: BaseException) -> None:
+        logger.error(f"[{env}] agent call failed: {exc!r}", exc_info=exc)
+        with self.lock:
+            self.running[env] -= 1
+            self.stats[env].failures += 1
+            self._dispatch()
+        fut.set_exception(exc)
+
+    def on_finished_run(self, env: str, outcome: Any) -> None:
+        with self.lock:
+            st = self.stats[env]
+            st.runs_finished += 1
+            st.outcomes[json.dumps(outcome, sort_keys=True)] += 1
+
+    def report(self) -> None:
+        with self.lock:
+            for env in sorted(self.stats):
+                logger.info(f"[{env}] {self.stats[env].summary()}")
+
+    def close(self) -> None:
+        self.pool.terminate()
+        self.pool.join()
+
+
+class SupervisedRequestProcessor(RequestProcessor):
+    """
+    Per-env request processor that hands its work to the shared supervisor pool.
+
+    A failed agent call is skipped, so the server asks for the same action again. After
+    `max_attempts` failures of one action the run is given up and abandoned instead of
+    retrying a deterministic failure forever.
+    """
+
+    def __init__(self, supervisor: Supervisor, env: str, max_attempts: int = 3):
+        self.supervisor = supervisor
+        self.env = env
+        self.max_attempts = max_attempts
+        self.failures: Counter = Counter()   # (run_id, act_no) -> failed attempts
+        self.given_up: Set[str] = set()
+        self._to_abandon: List[str] = []
+        supervisor.register(env)
+
+    def process_requests(self, requests: List[Tuple[Any, RequestInfo]], counter: _RunTracker) -> List[Action]:
+        requests = [(percept, info) for percept, info in requests if info.run_id not in self.given_up]
+        futures = [self.supervisor.submit(self.env, percept, info) for percept, info in requests]
+        actions: List[Action] = []
+        for fut, (_percept, info) in zip(futures, requests):
+            try:
+                action = fut.result()
+            except Exception:
+                # already logged and counted by the supervisor
+                self._record_failure(info)
+                continue
+            actions.append({'run': info.run_id, 'act_no': info.action_number, 'action': action})
+        return actions
+
+    def _record_failure(self, info: RequestInfo) -> None:
+        key = (info.run_id, info.action_number)
+        self.failures[key] += 1
+        if self.failures[key] >= self.max_attempts and info.run_id not in self.given_up:
+            logger.error(f"[{self.env}] action {info.action_number} of run {info.run_id} failed "
+                         f"{self.failures[key]} times; abandoning the run")
+            self.given_up.add(info.run_id)
+            self._to_abandon.append(info.run_id)
+
+    def runs_to_abandon(self) -> List[str]:
+        out, self._to_abandon = self._to_abandon, []
+        return out
+
+    def on_finished_run(self, run_id: str, url: str, outcome: Any):
+        for key in [k for k in self.failures if k[0] == run_id]:
+            del self.failures[key]
+        self.given_up.discard(run_id)
+        self.supervisor.on_finished_run(self.env, outcome)
+        super().on_finished_run(run_id, url, outcome)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several env configs from one process tree.")
+    parser.add_argument("configs", nargs="+", help="agent config JSON files")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--run-limit", type=int, default=60, help="runs per env (0: unlimited)")
+    parser.add_argument("--report-every", type=float, default=60.0, help="seconds between statistics reports")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Build and check the geometry once; the pool initializer hands it to every worker.
+    validate_constants()
+    geometries = tuple(get_geometry(shape) for shape in sorted({info.shape for info in ENV_INFO.values()}))
+
+    from agent import agent_function
+
+    supervisor = Supervisor(agent_function, args.processes, geometries)
+    threads = []
+    try:
+        for path in args.configs:
+            cfg = _get_agent_config(Path(path))
+            logger.info(f"Starting env {cfg['env']} from {path}")
+            t = threading.Thread(
+                target=_run,
+                args=(cfg, SupervisedRequestProcessor(supervisor, cfg["env"])),
+                kwargs=dict(parallel_runs=True, abandon_old_runs=True, run_limit=args.run_limit or None),
+                name=cfg["env"],
+                daemon=True,
+            )
+            t.start()
+            threads.append(t)
+
+        last_report = time.monotonic()
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=1.0)
+            if time.monotonic() - last_report >= args.report_every:
+                supervisor.report()
+                last_report = time.monotonic()
+    finally:
+        supervisor.report()
+        supervisor.close()
+
+    print("Exited cleanly.")
+
+
+if __name__ == "__main__":
+    main()
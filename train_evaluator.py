@@ -0,0 +1,47 @@
+import argparse
+import logging
+
+import numpy as np
+
+from fauhalma.constants import ENV_INFO
+from fauhalma.evaluation import FEATURES, fit_linear, fit_mlp, training_set
+from fauhalma.recording import iter_runs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the leaf evaluator on recorded runs.")
+    parser.add_argument("log_dir", help="directory written by `python agent.py CONFIG LOG_DIR`")
+    parser.add_argument("out", help="output .npz file (load with fauhalma.evaluation.load_evaluator)")
+    parser.add_argument("--env", default=None, help="only use runs of this env")
+    parser.add_argument("--mlp", type=int, default=0, metavar="HIDDEN",
+                        help="fit a one-hidden-layer MLP with HIDDEN units instead of a linear model")
+    parser.add_argument("--epochs", type=int, default=500)
+    args = parser.parse_args()
+
+    Xs, ys = [], []
+    for env, run_id, states in iter_runs(args.log_dir, args.env):
+        X, y = training_set([states], ENV_INFO[env].shape)
+        Xs.append(X)
+        ys.append(y)
+    if not Xs:
+        raise SystemExit(f"No recorded runs found in {args.log_dir}")
+    X = np.vstack(Xs)
+    y = np.concatenate(ys)
+    logger.info(f"Training on {len(y)} positions from {len(Xs)} runs")
+
+    model = fit_mlp(X, y, hidden=args.mlp, epochs=args.epochs) if args.mlp else fit_linear(X, y)
+    rmse = float(np.sqrt(np.mean((model.score(X) - y) ** 2)))
+    logger.info(f"Training RMSE (moves): {rmse:.3f}")
+    if not args.mlp:
+        for name, w in zip(FEATURES, model.weights):
+            logger.info(f"  {name:>20s}: {w:+.4f}")
+
+    model.save(args.out)
+    logger.info(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import argparse
+import logging
+
+from fauhalma.constants import ENV_INFO
+from fauhalma.opponent_model import decisions_from_run, fit_opponent_model, save_models
+from fauhalma.recording import iter_runs
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def load_decisions(log_dir: str, env: str | None = None) -> dict[str, list]:
+    """env -> list of (state, opponent, move) reconstructed from the recorded runs."""
+    out: dict[str, list] = {}
+    for run_env, run_id, states in iter_runs(log_dir, env):
+        if not states:
+            continue
+        order = tuple(p for p in "ABC" if states[0].pegs.get(p))
+        out.setdefault(run_env, []).extend(decisions_from_run(states, ENV_INFO[run_env].shape, order))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit per-env opponent models on recorded runs.")
+    parser.add_argument("log_dir", help="directory written by `python agent.py CONFIG LOG_DIR`")
+    parser.add_argument("out", help="output .json file (load with fauhalma.opponent_model.load_models)")
+    parser.add_argument("--env", default=None, help="only fit this env")
+    args = parser.parse_args()
+
+    models = {}
+    for env, decisions in sorted(load_decisions(args.log_dir, args.env).items()):
+        logger.info(f"{env}: fitting on {len(decisions)} opponent moves")
+        models[env] = fit_opponent_model(decisions, ENV_INFO[env].shape)
+    if not models:
+        raise SystemExit(f"No recorded runs found in {args.log_dir}")
+
+    save_models(models, args.out)
+    logger.info(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()